@@ -1,353 +1,112 @@
 # app.py
-# Produkcyjna wersja (Opcja A): zapis postępu do GitHuba + stabilny UID z fingerprintu (bez cookies/localStorage)
+# Produkcyjna wersja (Opcja A): zapis postępu do GitHuba (albo lokalnego SQLite) + stabilny UID z fingerprintu (bez cookies/localStorage)
 # - Goły link https://seduceme.streamlit.app/ -> zawsze ten sam UID na danym urządzeniu/przeglądarce (best-effort)
 # - Link z ?uid=... nadal działa jako "przeniesienie konta" na inne urządzenie
-# - Odblokowanie globalne od 1 stycznia 2026, po 14 dniu wszystko odblokowane na stałe
+# - Kampanie (treść dni + start odblokowania) w campaigns/*.json; jeden dzień odblokowuje się co dobę od startu
+#   kampanii, po ostatnim dniu wszystko zostaje odblokowane. ?campaign=<id> wybiera kampanię dla nowego uid.
+# - Kampania z "unlock": "personal": każdy uid liczy doby od pierwszej wizyty ("start" w rekordzie)
 #
 # Wymagane secrets (Streamlit Cloud -> Settings -> Secrets):
 # GITHUB_TOKEN = "..."
 # GITHUB_REPO = "owner/repo"   # np. "A6r6n6i6E/SeduceMe"
 # GITHUB_BRANCH = "main"       # opcjonalnie
+# GITHUB_API_URL = "https://api.github.com"  # opcjonalnie (GitHub Enterprise / bench/fake_github.py)
+# STORAGE_BACKEND = "github"   # opcjonalnie: "github" (domyślnie) albo "sqlite"
+# SQLITE_PATH = "progress.db"  # dla STORAGE_BACKEND = "sqlite" (dysk Streamlit Cloud jest ulotny!)
+# STORAGE_LAYOUT = "file"     # dla "github": "file" (progress/{uid}.json) albo "sharded" (progress/shards/)
+# RECORD_CACHE_SIZE = 4096    # opcjonalnie: wspólny (wszystkie sesje) cache odczytów; 0 = wyłączony
+# RECORD_CACHE_TTL_S = 30
+# WARMUP_LEAD_S = 300         # opcjonalnie: rozgrzewka cache odczytów tyle sekund przed północnym odblokowaniem; 0 = wyłączona
 # APP_URL = "https://seduceme.streamlit.app"  # opcjonalnie, do pokazywania pełnego linku w sidebar
+# DEFAULT_CAMPAIGN = "seduceme-2026"  # opcjonalnie: kampania dla nowych uid bez ?campaign=
+# CAMPAIGNS_DIR = "campaigns"  # opcjonalnie: katalog z plikami kampanii
+# APP_FIXED_NOW = "2026-01-05T12:00"  # opcjonalnie: stały czas (testy / testy obciążeniowe przyszłych dni)
+# WRITES_PER_MIN = 60         # opcjonalnie: ile zapisów/min wysyłamy do GitHuba (secondary rate limit)
+# JOURNAL_PATH = ".progress-journal.ndjson"  # lokalny dziennik zmian (write-ahead) przed zapisem do storage
+# STARTUP_PROFILE = true      # opcjonalnie: czasy importów i faz pierwszego renderu w sidebar (też ?profile=1)
+# METRICS_PANEL = true        # opcjonalnie: p50/p95/p99 spanów + limit GitHub API w sidebar (też ?metrics=1)
 #
 # requirements.txt:
-# streamlit>=1.30
+# streamlit>=1.40
 # tzdata>=2024.1
 # requests>=2.31
 
-import base64
+import time
+
+_APP_T0 = time.perf_counter()  # -> IMPORT_TIMES["app"]: importy + definicje modułu w pierwszym przebiegu procesu
+
 import hashlib
-import json
+import os
+import uuid
+from contextlib import contextmanager
 from dataclasses import dataclass
-from datetime import date, datetime
+from datetime import datetime
 from zoneinfo import ZoneInfo
 
-import requests
-import streamlit as st
+from tracing import IMPORT_TIMES, export_jsonl, import_timer, summary, traced
+
+# pod `streamlit run` serwer ładuje streamlit przed app.py (tu ~0 ms) — pełny koszt: python -X importtime -c "import app"
+with import_timer("streamlit"):
+    import streamlit as st
+    from streamlit.errors import StreamlitAPIException
+
+from storage import (
+    MERGE_STATS,
+    RATE_LIMIT,
+    REACTION_EMOJI,
+    JOURNAL_PATH,
+    WRITES_PER_MIN,
+    WARMUP_LEAD_S,
+    CachedStore,
+    CacheWarmer,
+    Journal,
+    ProgressStore,
+    RateLimited,
+    SaveWorker,
+    WriteLimiter,
+    decode_reactions,
+    encode_reactions,
+    make_record,
+    merge_records,
+    store_from_config,
+    upgrade_record,
+)
+with import_timer("campaigns"):
+    from campaigns import CAMPAIGNS_DIR, LEGACY_CAMPAIGN_ID, Campaign, Timeline, load_campaigns, unlock_timeline
 
 # =========================
 # KONFIG
 # =========================
 APP_TZ = ZoneInfo("Europe/Warsaw")
 
-GLOBAL_START = date(2026, 1, 1)  # start globalny
-TOTAL_DAYS = 14
-
-st.set_page_config(
-    page_title="SeduceMe — 14 dni",
-    page_icon="🔥",
-    layout="wide",
-    initial_sidebar_state="collapsed",
-)
-
-# =========================
-# DANE (14 DNI)
-# =========================
-DAYS = [
-    {
-        "day": 1,
-        "title": "Ogniste Spojrzenia",
-        "task": (
-            "Spójrzcie sobie głęboko w oczy i powoli zbliżajcie się do pocałunku. "
-            "Każdy kolejny pocałunek jest dłuższy, bardziej gorący i pełen napięcia. "
-            "Eksplorujcie usta, szyję i ramiona, ciesząc się każdym dotykiem i oddechem partnera."
-        ),
-        "emoji": "🔥",
-        "duration_min": 5,
-    },
-    {
-        "day": 2,
-        "title": "Dotyk Zakazany",
-        "task": (
-            "Masujcie się nawzajem, prowadząc dłonie przez strefy najbardziej podniecające – uda, pośladki, "
-            "szyję, klatkę piersiową. Pozwólcie dłoniom „przypadkowo” odkrywać więcej, igrając z przyjemnością "
-            "i oczekiwaniem."
-        ),
-        "emoji": "💋",
-        "duration_min": 10,
-    },
-    {
-        "day": 3,
-        "title": "Szepty Rozkoszy",
-        "task": (
-            "Szeptajcie sobie do ucha fantazje, które nigdy nie padły na głos. Niech każde słowo rozpala ciało, "
-            "a każdy szept kończy się powolnym, rozkosznym pocałunkiem w szyję, ucho lub wargi."
-        ),
-        "emoji": "🖤",
-        "duration_min": 8,
-    },
-    {
-        "day": 4,
-        "title": "Kusiciel i Uległy",
-        "task": (
-            "Jedna osoba prowadzi grę: decyduje, gdzie i jak dotyka, tempo pocałunków, nacisk dłoni. "
-            "Druga poddaje się całkowicie. Po 10–15 minutach zamieńcie role."
-        ),
-        "emoji": "👑",
-        "duration_min": 15,
-    },
-    {
-        "day": 5,
-        "title": "Smak Ciebie",
-        "task": (
-            "Eksplorujcie siebie nawzajem poprzez smak: lody, czekolada, owoce, bita śmietana – "
-            "pozwólcie ustom i językowi powoli wędrować po najbardziej erotycznych miejscach."
-        ),
-        "emoji": "🍓",
-        "duration_min": 15,
-    },
-    {
-        "day": 6,
-        "title": "Nieprzerwany Pocałunek",
-        "task": (
-            "Zanurzcie się w powolnym, długim pocałunku, całując i pieszcząc ciało partnera bez przerwy przez "
-            "10–15 minut. Nie zmieniajcie tempa – pozwólcie, aby napięcie rosło z każdą sekundą."
-        ),
-        "emoji": "💋",
-        "duration_min": 15,
-    },
-    {
-        "day": 7,
-        "title": "Rozgrzany Dotyk",
-        "task": (
-            "Podarujcie sobie zmysłowy masaż z olejkiem lub balsamem. Powoli przesuwajcie dłonie po całym ciele, "
-            "zatrzymując się w miejscach, które wywołują najwięcej przyjemności."
-        ),
-        "emoji": "🕯️",
-        "duration_min": 20,
-    },
-    {
-        "day": 8,
-        "title": "Gra Napięcia",
-        "task": (
-            "Jedna osoba prowokuje drugą do ekstremalnego pożądania, zatrzymując się tuż przed spełnieniem. "
-            "Odwracajcie role i powtarzajcie kilka razy, ile wytrzymacie."
-        ),
-        "emoji": "⚡",
-        "duration_min": 15,
-    },
-    {
-        "day": 9,
-        "title": "Cisza i Oddychanie",
-        "task": (
-            "Leżcie naprzeciw siebie, ciało przy ciele. Jedna osoba przesuwa dłonie powoli po ciele partnera, "
-            "blisko najbardziej podniecających miejsc, bez bezpośredniego dotyku. Po kilku minutach zamieńcie role."
-        ),
-        "emoji": "🌙",
-        "duration_min": 10,
-    },
-    {
-        "day": 10,
-        "title": "Dotyk w Cieniu",
-        "task": (
-            "Jedna osoba ma zasłonięte oczy i całkowicie oddaje się prowadzeniu. Druga eksploruje ciało ustami i dłonią, "
-            "odkrywając miejsca, które najbardziej rozpędzają krew i przyspieszają oddech."
-        ),
-        "emoji": "🎭",
-        "duration_min": 15,
-    },
-    {
-        "day": 11,
-        "title": "Zmysłowy Tekst",
-        "task": (
-            "Przez cały dzień wysyłajcie sobie krótkie, pikantne instrukcje (max. 3 wiadomości na osobę). "
-            "Wieczorem zrealizujcie jedną z tych fantazji."
-        ),
-        "emoji": "📩",
-        "duration_min": 5,
-    },
-    {
-        "day": 12,
-        "title": "Tajemniczy Kusiciel",
-        "task": (
-            "Każde z Was wybiera jedną cechę, którą dziś przejmuje (np. pewność siebie, kontrolę, powolność). "
-            "Nie mówcie tego na głos. Pozwólcie, by cecha kierowała każdym dotykiem i spojrzeniem."
-        ),
-        "emoji": "🦂",
-        "duration_min": 12,
-    },
-    {
-        "day": 13,
-        "title": "Pełne Odkrycie",
-        "task": (
-            "Powiedzcie sobie po jednym, skrywanym sekrecie lub fantazji — jedno zdanie, bez kompromisów. "
-            "Następnie druga osoba realizuje dokładnie to, co usłyszała — powoli, świadomie, z maksymalnym napięciem."
-        ),
-        "emoji": "🔓",
-        "duration_min": 20,
-    },
-    {
-        "day": 14,
-        "title": "Rytuał Rozkoszy",
-        "task": (
-            "Dziś możecie wszystko. Każdy pocałunek, dotyk, fantazja, oddech jest dozwolony. "
-            "Połączcie wszystkie zmysły: dotyk, smak, zapach, słowo, spojrzenie. "
-            "Dajcie się ponieść namiętności i zanurzcie się w siebie nawzajem."
-        ),
-        "emoji": "✨",
-        "duration_min": 30,
-    },
-]
+PROGRESS_CACHE_TTL_S = 60  # ile sekund progres w session_state jest uznawany za świeży
+SAVE_DEBOUNCE_S = 2.0  # zmiany z kilku kliknięć zapisujemy jednym commitem po tylu sekundach ciszy
+HISTORY_PAGE_SIZE = 28  # dni na stronę historii (kampania 14-dniowa mieści się na jednej)
+
+# page_icon-emoji: pierwsze wywołanie w procesie ładuje tabelę emoji Streamlit (streamlit.emojis)
+with import_timer("streamlit.emojis"):
+    st.set_page_config(
+        page_title="SeduceMe",
+        page_icon="🔥",
+        layout="wide",
+        initial_sidebar_state="collapsed",
+    )
 
 # =========================
 # CSS + mikro-animacje
 # =========================
-CSS = """
-<style>
-@import url('https://fonts.googleapis.com/css2?family=Playfair+Display:ital,wght@1,600;1,700&family=Montserrat:wght@300;400;600;700&display=swap');
-
-:root{
-  --bg: #1A1A1A;
-  --accent: #C1272D;
-  --heading: #7B1E24;
-  --gold: #D4AF37;
-  --muted: rgba(255,255,255,.68);
-  --muted2: rgba(255,255,255,.52);
-}
-
-html, body, [data-testid="stAppViewContainer"]{
-  background:
-    radial-gradient(900px 480px at 18% 8%, rgba(193,39,45,.18), transparent 60%),
-    radial-gradient(780px 440px at 85% 22%, rgba(212,175,55,.10), transparent 58%),
-    var(--bg);
-  color: white;
-  font-family: "Montserrat", system-ui, -apple-system, Segoe UI, Roboto, sans-serif;
-  overflow-x: hidden;
-}
-[data-testid="stHeader"]{ background: transparent; }
-
-/* delikatne "światło" */
-[data-testid="stAppViewContainer"]::before{
-  content:"";
-  position: fixed;
-  inset:-20%;
-  pointer-events:none;
-  background:
-    radial-gradient(540px 240px at 20% 20%, rgba(212,175,55,.10), transparent 60%),
-    radial-gradient(520px 260px at 70% 35%, rgba(193,39,45,.14), transparent 62%),
-    radial-gradient(480px 220px at 55% 80%, rgba(212,175,55,.08), transparent 60%);
-  animation: sdmLight 10s ease-in-out infinite alternate;
-  opacity: .9;
-}
-@keyframes sdmLight{
-  from{ transform: translate3d(0px, 0px, 0) scale(1); }
-  to  { transform: translate3d(-18px, 12px, 0) scale(1.02); }
-}
-
-/* iskry */
-[data-testid="stAppViewContainer"]::after{
-  content:"";
-  position: fixed;
-  inset:0;
-  pointer-events:none;
-  background-image:
-    radial-gradient(circle at 10% 20%, rgba(212,175,55,.14) 0 1px, transparent 2px),
-    radial-gradient(circle at 30% 70%, rgba(255,255,255,.08) 0 1px, transparent 2px),
-    radial-gradient(circle at 60% 30%, rgba(193,39,45,.12) 0 1px, transparent 2px),
-    radial-gradient(circle at 80% 60%, rgba(212,175,55,.10) 0 1px, transparent 2px),
-    radial-gradient(circle at 50% 90%, rgba(255,255,255,.06) 0 1px, transparent 2px);
-  background-size: 320px 320px;
-  opacity: .55;
-  animation: sdmSparks 12s linear infinite;
-}
-@keyframes sdmSparks{
-  from{ background-position: 0 0; }
-  to  { background-position: 320px 640px; }
-}
-
-.sdm-wrap{ max-width: 1120px; margin: 0 auto; padding: 0.5rem 0 2.5rem; }
-.sdm-logo{
-  font-family: "Playfair Display", serif;
-  font-style: italic;
-  letter-spacing: .5px;
-  font-size: 64px;
-  line-height: 1.0;
-  text-align: center;
-  background: linear-gradient(90deg, var(--accent), var(--heading));
-  -webkit-background-clip: text;
-  background-clip: text;
-  color: transparent;
-  text-shadow: 0 0 18px rgba(212,175,55,.20);
-  margin: 0.6rem 0 0.3rem;
-}
-.sdm-subtitle{
-  text-align:center;
-  color: var(--muted);
-  margin: 0 0 1.2rem;
-  font-weight: 300;
-}
-.sdm-card{
-  background: linear-gradient(180deg, rgba(255,255,255,.03), rgba(255,255,255,.01));
-  border: 1px solid rgba(255,255,255,.08);
-  border-radius: 22px;
-  padding: 20px 20px;
-  box-shadow: 0 14px 40px rgba(0,0,0,.45);
-}
-.sdm-h2{
-  font-family: "Playfair Display", serif;
-  font-style: italic;
-  color: var(--heading);
-  margin: 0 0 8px;
-  font-size: 34px;
-}
-.sdm-task{
-  color: rgba(255,255,255,.82);
-  font-size: 17px;
-  line-height: 1.65;
-  margin: 0 0 14px;
-}
-.sdm-meta{
-  display:flex;
-  gap: 10px;
-  flex-wrap: wrap;
-  color: var(--muted2);
-  font-size: 14px;
-  margin-top: 6px;
-}
-.sdm-pill{
-  display:inline-flex;
-  align-items:center;
-  gap: 8px;
-  padding: 7px 10px;
-  border-radius: 999px;
-  background: rgba(255,255,255,.04);
-  border: 1px solid rgba(255,255,255,.08);
-}
-.sdm-progress{
-  margin: 10px 0 18px;
-  padding: 10px 12px;
-  border-radius: 14px;
-  background: rgba(0,0,0,.18);
-  border: 1px solid rgba(255,255,255,.06);
-}
-.sdm-bar{
-  height: 8px;
-  border-radius: 999px;
-  background: rgba(255,255,255,.08);
-  overflow:hidden;
-}
-.sdm-bar > div{
-  height: 100%;
-  background: linear-gradient(90deg, var(--accent), var(--heading));
-  border-radius: 999px;
-  box-shadow: 0 0 18px rgba(193,39,45,.35);
-  transition: width .35s ease;
-}
-div.stButton > button{
-  border-radius: 14px !important;
-  border: 1px solid rgba(212,175,55,.42) !important;
-  background: radial-gradient(120px 40px at 20% 20%, rgba(255,255,255,.18), transparent 60%),
-              linear-gradient(90deg, var(--accent), var(--heading)) !important;
-  color: #F6E7B5 !important;
-  font-weight: 700 !important;
-  padding: 0.65rem 1.05rem !important;
-  box-shadow: 0 10px 28px rgba(0,0,0,.45) !important;
-  transition: transform .12s ease, filter .12s ease;
-}
-div.stButton > button:hover{ transform: translateY(-1px); filter: brightness(1.08); }
-div.stButton > button:active{ transform: translateY(0px) scale(.99); }
-</style>
-"""
+# Style są w static/seduceme.css; plik jest czytany raz na proces (load_css) i wstrzykiwany jako <style>.
+# Nie <link> do static serving: serwer Tornado (streamlit<1.53) serwuje .css jako text/plain + nosniff,
+# więc przeglądarka odrzuca arkusz. (Streamlit usuwa elementy, których przebieg nie wyemitował,
+# więc <style> idzie w każdym rerunie — gotowy string z cache, bez ponownego czytania pliku.)
+CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "seduceme.css")
+
+@st.cache_resource
+def load_css() -> str:
+    # bez pustych linii: markdown dzieliłby blok <style> na akapity
+    with open(CSS_PATH, encoding="utf-8") as f:
+        css = "\n".join(line.strip() for line in f if line.strip())
+    return f"<style>\n{css}\n</style>"
 
 # =========================
 # Pomocnicze: czas
@@ -355,26 +114,87 @@ div.stButton > button:active{ transform: translateY(0px) scale(.99); }
 def now_local() -> datetime:
     return datetime.now(APP_TZ)
 
-def today_local() -> date:
-    return now_local().date()
-
 # =========================
-# Globalne odblokowanie
+# Odblokowanie (snapshot zegara na przebieg)
 # =========================
-def active_day_global() -> int:
-    if today_local() < GLOBAL_START:
-        return 0
-    delta = (today_local() - GLOBAL_START).days
-    return max(1, min(TOTAL_DAYS, delta + 1))
-
-def is_unlocked(day: int) -> bool:
-    return day <= active_day_global()
+@dataclass(frozen=True)
+class Clock:
+    """
+    Stan odblokowania policzony raz na przebieg skryptu i przekazywany do rendererów,
+    żeby wszystkie widżety widziały ten sam dzień (także gdy przebieg trafi na północ).
+    """
+    now: datetime
+    active_day: int  # 0 = przed startem
+    unlocked: int  # bitmapa: bit (day - 1) ustawiony = dzień odblokowany
+    total_days: int
+    valid_until: datetime  # kolejne odblokowanie w harmonogramie uid — potem snapshot jest nieaktualny
+    timeline: Timeline
+
+    def is_unlocked(self, day: int) -> bool:
+        return bool((self.unlocked >> (day - 1)) & 1)
+
+    def expired(self) -> bool:
+        return now_local() >= self.valid_until
+
+def _fixed_now() -> datetime | None:
+    """APP_FIXED_NOW w secrets (ISO 8601) — stały czas do testów i testów obciążeniowych przyszłych dni."""
+    raw = st.secrets.get("APP_FIXED_NOW")
+    if not raw:
+        return None
+    fixed = datetime.fromisoformat(str(raw))
+    return fixed.replace(tzinfo=APP_TZ) if fixed.tzinfo is None else fixed.astimezone(APP_TZ)
+
+def clock_snapshot(campaign: Campaign, start: str | None = None, now: datetime | None = None) -> Clock:
+    """
+    Snapshot harmonogramu uid (start z rekordu albo start kampanii) na teraz.
+    now (albo APP_FIXED_NOW) przypina czas — taki snapshot nie wygasa.
+    """
+    pinned = now or _fixed_now()
+    now = pinned or now_local()
+    timeline = unlock_timeline(campaign, start)
+    active = timeline.active_day(now)
+    next_unlock = None if pinned else timeline.next_unlock(now)
+    return Clock(
+        now=now,
+        active_day=active,
+        unlocked=(1 << active) - 1,
+        total_days=campaign.total_days,
+        valid_until=next_unlock or datetime.max.replace(tzinfo=APP_TZ),
+        timeline=timeline,
+    )
 
-def progress_percent() -> int:
-    d = active_day_global()
-    if d <= 0:
-        return 0
-    return int(round((d / TOTAL_DAYS) * 100))
+# =========================
+# Kampanie (campaigns/*.json, raz na proces)
+# =========================
+@st.cache_resource
+def get_campaigns() -> dict[str, Campaign]:
+    """Wszystkie kampanie sparsowane i zwalidowane raz na proces (błąd w pliku = błąd startu)."""
+    return load_campaigns(st.secrets.get("CAMPAIGNS_DIR", CAMPAIGNS_DIR))
+
+def requested_campaign_id() -> str:
+    """Kampania dla uid bez zapisu: ?campaign=... albo DEFAULT_CAMPAIGN z secrets."""
+    campaigns = get_campaigns()
+    for cid in (st.query_params.get("campaign"), st.secrets.get("DEFAULT_CAMPAIGN"), LEGACY_CAMPAIGN_ID):
+        if cid in campaigns:
+            return cid
+    return next(iter(campaigns))
+
+def campaign_of(prog: "ProgressState") -> Campaign:
+    """Kampania z rekordu uid; nieznane id (usunięty plik) -> kampania z requested_campaign_id."""
+    campaigns = get_campaigns()
+    return campaigns.get(prog.campaign) or campaigns[requested_campaign_id()]
+
+def ensure_personal_start(uid: str, prog: "ProgressState", campaign: Campaign) -> None:
+    """
+    Kampania "personal": pierwsza wizyta uid ustala jego start i od razu trafia do kolejki zapisu,
+    żeby harmonogram nie zaczynał się od nowa przy kolejnej wizycie. Bez udanego odczytu
+    (progres spoza cache sesji) nie zapisujemy — nie nadpiszemy startu, którego nie widzieliśmy.
+    """
+    if not campaign.personal or prog.start is not None:
+        return
+    prog.start = campaign.personal_start(_fixed_now() or now_local()).isoformat(timespec="minutes")
+    if _storage_ok() and uid in _progress_cache():
+        queue_save(uid, prog)
 
 # =========================
 # UID: fingerprint (bez cookies/localStorage)
@@ -393,10 +213,10 @@ def _get_headers_lower() -> dict[str, str]:
         pass
     return {}
 
-def _fingerprint_uid() -> str:
+def _fingerprint_uid(campaign_id: str = LEGACY_CAMPAIGN_ID) -> str:
     """
-    Stabilny identyfikator per przeglądarka/urządzenie (best-effort).
-    Nie wymaga cookies/localStorage.
+    Stabilny identyfikator per przeglądarka/urządzenie (best-effort) i kampania.
+    Nie wymaga cookies/localStorage. Dla pierwszej kampanii bez soli — dotychczasowe uid się nie zmieniają.
     """
     h = _get_headers_lower()
 
@@ -406,9 +226,12 @@ def _fingerprint_uid() -> str:
     ch_plat = h.get("sec-ch-ua-platform", "")
 
     raw = f"ua={ua}|lang={lang}|ch={ch_ua}|plat={ch_plat}"
+    if campaign_id != LEGACY_CAMPAIGN_ID:
+        raw += f"|campaign={campaign_id}"
     digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()
     return f"d_{digest[:32]}"
 
+@traced()
 def ensure_uid() -> str:
     # 1) Jeśli uid jest w URL -> użyj go (to wspiera "przenoszenie konta")
     uid = st.query_params.get("uid")
@@ -416,408 +239,781 @@ def ensure_uid() -> str:
         st.session_state.user_id = uid.strip()
         return st.session_state.user_id
 
-    # 2) Jeśli nie ma uid w URL -> użyj fingerprintu
-    uid = _fingerprint_uid()
+    # 2) Jeśli nie ma uid w URL -> użyj fingerprintu (hash liczony raz na sesję)
+    uid = st.session_state.get("fingerprint_uid")
+    if not uid:
+        uid = _fingerprint_uid(requested_campaign_id())
+        st.session_state.fingerprint_uid = uid
     st.session_state.user_id = uid
 
-    # URL fallback (żeby user mógł skopiować link)
+    # URL fallback (żeby user mógł skopiować link); zmiana query params
+    # aktualizuje pasek adresu bez ponownego uruchomienia skryptu
     st.query_params["uid"] = uid
-    st.rerun()
+    return uid
 
 # =========================
-# GitHub storage (Contents API)
+# Storage (backend wybierany w secrets)
 # =========================
-def _secrets_ok() -> bool:
-    return "GITHUB_TOKEN" in st.secrets and "GITHUB_REPO" in st.secrets
-
-def _gh_repo() -> str:
-    return st.secrets["GITHUB_REPO"]
-
-def _gh_branch() -> str:
-    return st.secrets.get("GITHUB_BRANCH", "main")
-
-def _gh_headers() -> dict:
-    return {
-        "Authorization": f"token {st.secrets['GITHUB_TOKEN']}",
-        "Accept": "application/vnd.github+json",
-        "User-Agent": "seduceme-streamlit",
-    }
-
-def _gh_url(path: str) -> str:
-    return f"https://api.github.com/repos/{_gh_repo()}/contents/{path}"
+@st.cache_resource
+def get_store() -> ProgressStore | None:
+    """Jeden backend na proces; None = brak konfiguracji zapisu."""
+    return store_from_config(st.secrets)
+
+@st.cache_resource
+def get_save_worker() -> SaveWorker | None:
+    """Planista zapisów w tle (wspólny dla wszystkich sesji): limit zapisów + lokalny dziennik zmian."""
+    store = get_store()
+    if store is None:
+        return None
+    limiter = WriteLimiter(float(st.secrets.get("WRITES_PER_MIN", WRITES_PER_MIN))) if store.rate_limited else None
+    journal = Journal(st.secrets.get("JOURNAL_PATH", JOURNAL_PATH))
+    return SaveWorker(store, limiter=limiter, journal=journal)
+
+@st.cache_resource
+def get_cache_warmer() -> CacheWarmer | None:
+    """
+    Rozgrzewka cache odczytów przed północnym odblokowaniem (kampanie "global"; w "personal" każdy uid
+    ma własną godzinę, więc szczytu nie ma). Przy okazji prerenderuje karty wszystkich kampanii,
+    żeby karta nowego dnia była gotowa, zanim ktokolwiek ją otworzy.
+    """
+    store = get_store()
+    lead_s = float(st.secrets.get("WARMUP_LEAD_S", WARMUP_LEAD_S))
+    if not isinstance(store, CachedStore) or lead_s <= 0:
+        return None
+    campaigns = [c for c in get_campaigns().values() if not c.personal]
+    for campaign_id in get_campaigns():
+        render_templates(campaign_id)
 
-def gh_get_json(path: str) -> tuple[dict | None, str | None]:
-    r = requests.get(
-        _gh_url(path),
-        headers=_gh_headers(),
-        params={"ref": _gh_branch()},
-        timeout=20,
-    )
-    if r.status_code == 404:
-        return None, None
-    r.raise_for_status()
-    data = r.json()
-    content_b64 = data.get("content", "")
-    raw = base64.b64decode(content_b64).decode("utf-8") if content_b64 else "{}"
-    obj = json.loads(raw)
-    return obj, data.get("sha")
-
-def gh_put_json(path: str, obj: dict, sha: str | None) -> None:
-    raw = json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
-    payload = {
-        "message": f"Update {path}",
-        "content": base64.b64encode(raw).decode("utf-8"),
-        "branch": _gh_branch(),
-    }
-    if sha:
-        payload["sha"] = sha
-
-    r = requests.put(_gh_url(path), headers=_gh_headers(), json=payload, timeout=20)
-
-    # konflikt/niezgodny sha -> refetch i retry raz
-    if r.status_code in (409, 422):
-        _, latest_sha = gh_get_json(path)
-        payload.pop("sha", None)
-        if latest_sha:
-            payload["sha"] = latest_sha
-        r2 = requests.put(_gh_url(path), headers=_gh_headers(), json=payload, timeout=20)
-        r2.raise_for_status()
-        return
+    def next_boundary() -> float | None:
+        now = now_local()
+        unlocks = [t for c in campaigns if (t := unlock_timeline(c).next_unlock(now)) is not None]
+        return min(unlocks).timestamp() if unlocks else None
 
-    r.raise_for_status()
+    return CacheWarmer(store, next_boundary, lead_s=lead_s)
 
-def gh_delete_file(path: str, sha: str) -> None:
-    payload = {
-        "message": f"Delete {path}",
-        "sha": sha,
-        "branch": _gh_branch(),
-    }
-    r = requests.delete(_gh_url(path), headers=_gh_headers(), json=payload, timeout=20)
-    if r.status_code == 404:
-        return
-    r.raise_for_status()
+def _storage_ok() -> bool:
+    return get_store() is not None
 
 # =========================
 # Model progresu
 # =========================
-@dataclass
 class ProgressState:
-    completed: set[int]
-    favorites: set[int]
-    reactions: dict[int, str]
-    sha: str | None  # sha pliku na GitHub (do update/delete)
+    """
+    Progres pary w kodowaniu rekordu v2: maski bitowe dni (bit d-1 = dzień d) i znaki reakcji
+    (indeksy REACTION_EMOJI, patrz storage.encode_reactions). __slots__ — tysiące sesji w procesie.
+    """
 
-def progress_path(uid: str) -> str:
-    return f"progress/{uid}.json"
+    __slots__ = ("completed", "favorites", "reactions", "reactions_extra", "sha", "base", "campaign", "start")
+
+    def __init__(self, sha: str | None = None, base: dict | None = None, campaign: str | None = None):
+        self.completed = 0
+        self.favorites = 0
+        self.reactions = ""
+        self.reactions_extra: dict[str, str] | None = None  # reakcje spoza REACTION_EMOJI (stare rekordy)
+        self.sha = sha  # wersja rekordu w storage (sha pliku na GitHub / rewizja w SQLite)
+        self.base = base  # rekord w wersji sha — baza do scalania przy konflikcie
+        self.campaign = campaign  # id kampanii uid (None = jeszcze nieustalona, patrz campaign_of)
+        self.start: str | None = None  # własny start odblokowania (ISO 8601), patrz ensure_personal_start
+
+    def is_completed(self, day: int) -> bool:
+        return bool(self.completed >> (day - 1) & 1)
+
+    def is_favorite(self, day: int) -> bool:
+        return bool(self.favorites >> (day - 1) & 1)
+
+    def completed_count(self) -> int:
+        return self.completed.bit_count()
+
+    def mark_completed(self, day: int) -> None:
+        self.completed |= 1 << (day - 1)
+
+    def toggle_favorite(self, day: int) -> None:
+        self.favorites ^= 1 << (day - 1)
+
+    def reaction_map(self) -> dict[int, str]:
+        return decode_reactions(self.reactions, self.reactions_extra)
+
+    def reaction(self, day: int, default: str) -> str:
+        return self.reaction_map().get(day, default)
+
+    def set_reaction(self, day: int, emoji: str) -> None:
+        reactions = self.reaction_map()
+        reactions[day] = emoji
+        self.reactions, extra = encode_reactions(reactions)
+        self.reactions_extra = extra or None
+
+def apply_record(prog: ProgressState, obj: dict) -> ProgressState:
+    """Nadpisuje completed/favorites/reactions wartościami z rekordu storage (v1 albo v2)."""
+    rec = upgrade_record(obj)
+    prog.completed = int(rec.get("c", 0))
+    prog.favorites = int(rec.get("f", 0))
+    prog.reactions = str(rec.get("r", ""))
+    prog.reactions_extra = rec.get("rx") or None
+    prog.campaign = rec.get("campaign") or LEGACY_CAMPAIGN_ID
+    prog.start = rec.get("start") or None
+    return prog
 
+@traced()
 def load_progress(uid: str) -> ProgressState:
-    if not _secrets_ok():
-        return ProgressState(set(), set(), {}, None)
+    store = get_store()
+    if store is None:
+        return ProgressState()
 
-    obj, sha = gh_get_json(progress_path(uid))
+    obj, sha = store.load(uid)
     if not obj:
-        return ProgressState(set(), set(), {}, None)
-
-    completed = set(int(x) for x in obj.get("completed", []) if str(x).isdigit())
-    favorites = set(int(x) for x in obj.get("favorites", []) if str(x).isdigit())
-
-    reactions_raw = obj.get("reactions", {})
-    reactions: dict[int, str] = {}
-    if isinstance(reactions_raw, dict):
-        for k, v in reactions_raw.items():
-            try:
-                day = int(k)
-            except Exception:
-                continue
-            if isinstance(v, str) and v.strip():
-                reactions[day] = v
-
-    return ProgressState(completed=completed, favorites=favorites, reactions=reactions, sha=sha)
-
-def save_progress(uid: str, prog: ProgressState) -> ProgressState:
-    obj = {
-        "uid": uid,
-        "updated_at": now_local().isoformat(),
-        "completed": sorted(list(prog.completed)),
-        "favorites": sorted(list(prog.favorites)),
-        "reactions": {str(k): v for k, v in prog.reactions.items()},
-        "schema_version": 1,
-    }
-    path = progress_path(uid)
-    gh_put_json(path, obj, prog.sha)
+        return ProgressState()
+
+    return apply_record(ProgressState(sha, base=obj), obj)
+
+def progress_record(uid: str, prog: ProgressState) -> dict:
+    return make_record(
+        uid, now_local().isoformat(), prog.completed, prog.favorites, prog.reactions, prog.reactions_extra,
+        campaign=prog.campaign, start=prog.start,
+    )
+
+# =========================
+# Cache progresu (per sesja)
+# =========================
+def _progress_cache() -> dict[str, tuple[float, ProgressState]]:
+    if "progress_cache" not in st.session_state:
+        st.session_state.progress_cache = {}
+    return st.session_state.progress_cache
 
-    # po zapisie pobierz sha
-    _, sha2 = gh_get_json(path)
-    prog.sha = sha2 or prog.sha
+def load_progress_cached(uid: str) -> ProgressState:
+    """
+    load_progress z cache w session_state (TTL: PROGRESS_CACHE_TTL_S).
+    Reruny czysto nawigacyjne nie odpytują storage.
+    """
+    cache = _progress_cache()
+    hit = cache.get(uid)
+    if hit and (save_in_progress(uid) or time.monotonic() - hit[0] < PROGRESS_CACHE_TTL_S):
+        # niezapisane zmiany mają pierwszeństwo przed stanem ze storage
+        return hit[1]
+    prog = load_progress(uid)
+    cache[uid] = (time.monotonic(), prog)
     return prog
 
+def invalidate_progress_cache(uid: str) -> None:
+    _progress_cache().pop(uid, None)
+
 # =========================
-# UI helpers
+# Write-behind: zbiorczy zapis progresu w tle
 # =========================
-def render_progress_bar():
-    d = active_day_global()
-    pct = progress_percent()
+def _save_queue() -> dict[str, dict]:
+    """
+    uid -> {"touched": monotonic ostatniej zmiany/nieudanej próby (None = nic nie czeka),
+            "ticket": bilet zapisu w SaveWorker (None = nic nie leci),
+            "status": pending|saving|queued|saved|error, "error": str|None, "toast": do pokazania po zapisie}
+    """
+    if "save_queue" not in st.session_state:
+        st.session_state.save_queue = {}
+    return st.session_state.save_queue
 
-    if d == 0:
-        st.markdown(
-            f"""
-            <div class="sdm-progress">
-              <div style="display:flex; align-items:center; justify-content:space-between; gap:12px;">
-                <div style="color:rgba(255,255,255,.78); font-size:14px;"><b>Start już wkrótce</b></div>
-                <div style="color:rgba(255,255,255,.55); font-size:12px;">
-                  Start globalny: {GLOBAL_START.isoformat()} (Europe/Warsaw)
-                </div>
+def queue_save(uid: str, prog: ProgressState) -> None:
+    """
+    Oznacza progres jako zmieniony i dopisuje go do lokalnego dziennika (czeka na fsync — kilka ms);
+    zapis do storage nastąpi po SAVE_DEBOUNCE_S ciszy. Wpis z dziennika przeżyje błąd sieci i restart
+    procesu, a gdy sesja zniknie przed zapisem, wyśle go SaveWorker.
+    """
+    _progress_cache()[uid] = (time.monotonic(), prog)
+    entry = _save_queue().setdefault(uid, {})
+    entry.update(touched=time.monotonic(), status="pending", error=None)
+    worker = get_save_worker()
+    if worker is not None and worker.journal is not None:
+        seq = worker.journal.append(uid, progress_record(uid, prog), prog.sha, prog.base, origin=_save_origin())
+        entry.update(seq=seq, journaled=worker.journal.wait_durable(seq))
+
+def has_pending_save(uid: str) -> bool:
+    entry = _save_queue().get(uid)
+    return bool(entry and entry.get("touched") is not None)
+
+def save_in_progress(uid: str) -> bool:
+    """Są niezapisane zmiany albo zapis jeszcze trwa w tle."""
+    entry = _save_queue().get(uid)
+    return bool(entry and (entry.get("touched") is not None or entry.get("ticket") is not None))
+
+def discard_pending_save(uid: str) -> None:
+    _save_queue().pop(uid, None)
+    worker = get_save_worker()
+    if worker is not None:
+        worker.forget(uid)
+
+def _save_origin() -> str:
+    """Źródło zapisów tej sesji dla SaveWorker — zapisy innych kart/urządzeń tego uid są z nimi scalane."""
+    if "save_origin" not in st.session_state:
+        st.session_state.save_origin = uuid.uuid4().hex
+    return st.session_state.save_origin
+
+def flush_progress(uid: str, force: bool = False) -> bool:
+    """
+    Przekazuje wszystkie zaległe zmiany uid do zapisu w tle (jeden commit).
+    Bez force czeka aż minie SAVE_DEBOUNCE_S od ostatniej zmiany.
+    Zwraca True, gdy zapis został zlecony albo nic nie czekało.
+    """
+    if not has_pending_save(uid):
+        return True
+    entry = _save_queue()[uid]
+    if not force and time.monotonic() - entry["touched"] < SAVE_DEBOUNCE_S:
+        return False
+
+    hit = _progress_cache().get(uid)
+    worker = get_save_worker()
+    if not hit or worker is None:
+        discard_pending_save(uid)
+        return True
+
+    prog = hit[1]
+    record = progress_record(uid, prog)
+    entry.update(
+        touched=None,
+        status="saving",
+        error=None,
+        submitted=record,
+        ticket=worker.submit(uid, record, prog.sha, prog.base, seq=entry.get("seq"), origin=_save_origin()),
+    )
+    return True
+
+def poll_save(uid: str) -> None:
+    """
+    Odbiera wynik zapisu z SaveWorker do session_state (sha, status, toast).
+    Jeśli przy zapisie doszło do scalenia z cudzymi zmianami, dokłada je do lokalnego stanu
+    (scalenie trójstronne: to, co wysłaliśmy / stan lokalny / to, co zapisano).
+    """
+    entry = _save_queue().get(uid)
+    worker = get_save_worker()
+    if not entry or entry.get("ticket") is None or worker is None:
+        return
+    res = worker.result(uid, entry["ticket"], _save_origin())
+    if res is None:
+        if entry.get("touched") is None:
+            # limit GitHub API: zapis czeka w trwałej kolejce, to nie błąd
+            entry["status"] = "queued" if worker.is_deferred(uid) else "saving"
+        return
+    version, error, saved = res
+    entry["ticket"] = None
+    if error:
+        # zostaje w kolejce -> ponowimy po SAVE_DEBOUNCE_S albo przy następnym pełnym przebiegu
+        entry.update(touched=time.monotonic(), status="error", error=error, toast="error")
+        return
+    hit = _progress_cache().get(uid)
+    if hit:
+        prog = hit[1]
+        submitted = entry.pop("submitted", None)
+        if saved is not None:
+            if submitted is not None and saved != submitted:
+                apply_record(prog, merge_records(submitted, progress_record(uid, prog), saved))
+            prog.base = saved
+        if version:
+            prog.sha = version
+    if entry.get("touched") is None:
+        entry.update(status="saved", error=None, toast="saved")
+
+def _save_status_html(uid: str) -> str:
+    entry = _save_queue().get(uid) or {}
+    label = {
+        "pending": "💾 Zapisano lokalnie" if entry.get("journaled") else "🕓 Niezapisane zmiany",
+        "saving": "⏳ Zapisywanie…",
+        "queued": "📥 W kolejce — zapiszemy, gdy GitHub pozwoli",
+        "saved": "✅ Zapisano",
+        "error": "⚠️ Błąd zapisu — ponowię",
+    }.get(entry.get("status"), "")
+    if not label:
+        return ""
+    title = (entry.get("error") or "").replace('"', "'")
+    return (
+        f'<div style="text-align:right; color:rgba(255,255,255,.55); font-size:12px;" title="{title}">'
+        f"{label}</div>"
+    )
+
+def _save_toast(uid: str) -> None:
+    entry = _save_queue().get(uid) or {}
+    toast = entry.pop("toast", None)
+    if toast == "saved":
+        st.toast("Zapisano", icon="✅")
+    elif toast == "error":
+        st.toast(f"Błąd zapisu: {entry.get('error')}", icon="⚠️")
+
+@st.fragment(run_every=1)
+def _autosave_fragment(uid: str):
+    """Co sekundę: odbiór wyników z tła i zlecanie zapisu po debounce. Nie czeka na storage."""
+    poll_save(uid)
+    flush_progress(uid)
+    if not save_in_progress(uid):
+        # pełny rerun zatrzymuje timer fragmentu (i pokazuje toast)
+        st.rerun()
+    _save_toast(uid)
+    st.markdown(_save_status_html(uid), unsafe_allow_html=True)
+
+@traced()
+def render_save_status(uid: str):
+    if save_in_progress(uid):
+        _autosave_fragment(uid)
+    else:
+        _save_toast(uid)
+        st.markdown(_save_status_html(uid), unsafe_allow_html=True)
+
+# =========================
+# Prerenderowany HTML (raz na proces)
+# =========================
+def _compact_html(html: str) -> str:
+    return "".join(line.strip() for line in html.splitlines())
+
+@st.cache_resource
+def render_templates(campaign_id: str) -> dict:
+    """
+    Statyczne części kart i paska postępu zbudowane z dni kampanii raz na proces (osobno per kampania).
+    W rerunie dokładane są tylko dynamiczne pigułki (ukończone/ulubione/reakcja).
+    """
+    campaign = get_campaigns()[campaign_id]
+    total = campaign.total_days
+    card_open = []
+    card_locked = []
+    for data in campaign.days:
+        day = data.day
+        card_open.append(_compact_html(f"""
+            <div class="sdm-card">
+              <div class="sdm-h2">Dzień {day}: {data.title}</div>
+              <div class="sdm-task">{data.task}</div>
+              <div class="sdm-meta">
+                <span class="sdm-pill">⏱️ {data.duration_min}–{data.duration_min+5} min</span>
+        """))
+        card_locked.append(_compact_html(f"""
+            <div class="sdm-card">
+              <div class="sdm-h2">Dzień {day}: {data.title}</div>
+              <div class="sdm-task">
+                Ta karta jest jeszcze zablokowana — odblokuje się {{unlock}}.
+              </div>
+              <div class="sdm-meta">
+                <span class="sdm-pill">🔒 Zablokowana</span>
+                <span class="sdm-pill">Odblokowany dzień dziś: {{active}}/{total}</span>
               </div>
-              <div class="sdm-bar" style="margin-top:8px;"><div style="width:0%;"></div></div>
             </div>
-            """,
-            unsafe_allow_html=True,
-        )
-        return
+        """))
 
-    st.markdown(
-        f"""
+    progress = [_compact_html(f"""
         <div class="sdm-progress">
           <div style="display:flex; align-items:center; justify-content:space-between; gap:12px;">
-            <div style="color:rgba(255,255,255,.78); font-size:14px;">
-              Odblokowane: <b>Dzień {d}/{TOTAL_DAYS}</b>
-            </div>
+            <div style="color:rgba(255,255,255,.78); font-size:14px;"><b>Start już wkrótce</b></div>
             <div style="color:rgba(255,255,255,.55); font-size:12px;">
-              {pct}%
+              Start: {campaign.start.isoformat()} ({campaign.tz.key})
             </div>
           </div>
-          <div class="sdm-bar" style="margin-top:8px;">
-            <div style="width:{pct}%;"></div>
-          </div>
+          <div class="sdm-bar" style="margin-top:8px;"><div style="width:0%;"></div></div>
         </div>
-        """,
-        unsafe_allow_html=True,
-    )
+    """)]
+    for d in range(1, total + 1):
+        pct = int(round((d / total) * 100))
+        progress.append(_compact_html(f"""
+            <div class="sdm-progress">
+              <div style="display:flex; align-items:center; justify-content:space-between; gap:12px;">
+                <div style="color:rgba(255,255,255,.78); font-size:14px;">
+                  Odblokowane: <b>Dzień {d}/{total}</b>
+                </div>
+                <div style="color:rgba(255,255,255,.55); font-size:12px;">
+                  {pct}%
+                </div>
+              </div>
+              <div class="sdm-bar" style="margin-top:8px;">
+                <div style="width:{pct}%;"></div>
+              </div>
+            </div>
+        """))
+
+    return {
+        "card_open": card_open,
+        "card_close": "</div></div>",
+        "card_locked": card_locked,
+        "progress": progress,
+    }
 
-def current_link(uid: str) -> str:
+# =========================
+# UI helpers
+# =========================
+@traced()
+def render_progress_bar(campaign: Campaign, clock: Clock):
+    st.markdown(render_templates(campaign.id)["progress"][clock.active_day], unsafe_allow_html=True)
+
+def current_link(uid: str, campaign: Campaign) -> str:
     base = st.secrets.get("APP_URL", "").rstrip("/")
-    if base:
-        return f"{base}/?uid={uid}"
-    return f"/?uid={uid}"
-
-def render_sidebar(uid: str):
-    with st.sidebar:
-        st.markdown("### Informacje")
-        st.caption(f"uid: {uid[:8]}…")
-        st.caption(f"Start globalny: {GLOBAL_START.isoformat()}")
-        st.caption(f"Dziś odblokowane: {active_day_global()}/{TOTAL_DAYS}")
-
-        st.markdown("---")
-        st.markdown("### Twój link (do przeniesienia na inne urządzenie)")
-        st.code(current_link(uid), language="text")
-        st.caption("Jeśli otwierasz z aplikacji mailowej (in-app browser), najlepiej używać tego linku w normalnej przeglądarce.")
-
-        st.markdown("---")
-        if _secrets_ok():
-            st.caption(f"Repo storage: {_gh_repo()} ({_gh_branch()})")
-            st.caption(f"Plik: {progress_path(uid)}")
+    query = f"uid={uid}" if campaign.id == LEGACY_CAMPAIGN_ID else f"uid={uid}&campaign={campaign.id}"
+    return f"{base}/?{query}"
+
+def rerun_fragment():
+    """Rerun tylko bieżącego fragmentu; poza rerunem fragmentu (np. w AppTest) — całej aplikacji."""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+def session_progress(uid: str) -> ProgressState:
+    """Progres z cache sesji (bez sieci) — fragmenty nie wołają load_progress."""
+    hit = _progress_cache().get(uid)
+    return hit[1] if hit else ProgressState()
+
+@st.fragment
+@traced()
+def render_sidebar(uid: str, campaign: Campaign, clock: Clock):
+    # wołane w `with st.sidebar:` — fragment nie może sam otworzyć sidebara
+    st.markdown("### Informacje")
+    st.caption(f"uid: {uid[:8]}…")
+    st.caption(f"Kampania: {campaign.title} ({campaign.id})")
+    st.caption(f"Start: {clock.timeline.unlock_at[0]:%Y-%m-%d %H:%M} ({campaign.tz.key})")
+    st.caption(f"Dziś odblokowane: {clock.active_day}/{clock.total_days}")
+
+    st.markdown("---")
+    st.markdown("### Twój link (do przeniesienia na inne urządzenie)")
+    st.code(current_link(uid, campaign), language="text")
+    st.caption("Jeśli otwierasz z aplikacji mailowej (in-app browser), najlepiej używać tego linku w normalnej przeglądarce.")
+
+    st.markdown("---")
+    store = get_store()
+    if store is not None:
+        for line in store.describe(uid):
+            st.caption(line)
+    else:
+        st.error("Brak konfiguracji storage (GITHUB_TOKEN/GITHUB_REPO albo STORAGE_BACKEND) — zapis nie będzie działał.")
+
+    st.markdown("---")
+    if st.button("Reset (wyczyść mój progres)", type="secondary"):
+        if store is None:
+            st.warning("Brak konfiguracji storage — nie mogę zresetować.")
         else:
-            st.error("Brak secrets: GITHUB_TOKEN i/lub GITHUB_REPO — zapis nie będzie działał.")
-
-        st.markdown("---")
-        if st.button("Reset (wyczyść mój progres)", type="secondary"):
-            if not _secrets_ok():
-                st.warning("Brak konfiguracji GitHub — nie mogę zresetować.")
-            else:
-                path = progress_path(uid)
-                _, sha = gh_get_json(path)
-                if sha:
-                    gh_delete_file(path, sha)
-                st.toast("Progres zresetowany", icon="🗑️")
-                st.rerun()
-
-def render_history(prog: ProgressState):
+            store.delete(uid)
+            discard_pending_save(uid)
+            invalidate_progress_cache(uid)
+            st.toast("Progres zresetowany", icon="🗑️")
+            st.rerun()
+
+def _pick_history_day():
+    """on_change kafelków historii: przejście do karty dnia (fragment przerysuje się sam po zmianie widżetu)."""
+    day = st.session_state.history_pick
+    if day:
+        st.session_state.selected_day = day
+        st.session_state.show_history = False
+    st.session_state.history_pick = None
+
+@traced()
+def render_history(prog: ProgressState, campaign: Campaign, clock: Clock):
+    """
+    Siatka historii jako jeden widżet (st.pills) zamiast przycisku na dzień: koszt przebiegu i delty
+    nie rośnie z liczbą dni. Dłuższe kampanie idą stronami po HISTORY_PAGE_SIZE dni — budujemy tylko
+    bieżącą stronę. Odblokowane dni z bitmapy zegara, zablokowane jako jedna linia tekstu.
+    """
+    total = campaign.total_days
+    pages = -(-total // HISTORY_PAGE_SIZE)
+    if "history_page" not in st.session_state:
+        # domyślnie strona z dzisiejszym dniem
+        st.session_state.history_page = max(0, clock.active_day - 1) // HISTORY_PAGE_SIZE
+    page = min(int(st.session_state.history_page), pages - 1)
+    first = page * HISTORY_PAGE_SIZE + 1
+    last = min(total, first + HISTORY_PAGE_SIZE - 1)
+
     st.markdown(
-        """
+        f"""
         <div style="display:flex; align-items:flex-end; justify-content:space-between; gap:12px; margin-top:10px;">
           <div class="sdm-h2" style="margin:0;">Historia / Postępy</div>
           <div style="color:rgba(255,255,255,.55); font-size:13px;">
-            Kliknij dzień (zablokowane nieaktywne)
+            {f"Dni {first}–{last} z {total}" if pages > 1 else "Kliknij dzień"}
           </div>
         </div>
         """,
         unsafe_allow_html=True,
     )
+    if pages > 1:
+        p1, p2 = st.columns(2)
+        with p1:
+            if st.button("← Wcześniej", use_container_width=True, disabled=page == 0):
+                st.session_state.history_page = page - 1
+                rerun_fragment()
+        with p2:
+            if st.button("Dalej →", use_container_width=True, disabled=page == pages - 1):
+                st.session_state.history_page = page + 1
+                rerun_fragment()
     st.write("")
 
-    cols = st.columns(7)
-    for i in range(TOTAL_DAYS):
-        day = i + 1
-        reacted = prog.reactions.get(day, DAYS[i]["emoji"])
-        unlocked = is_unlocked(day)
-
-        with cols[i % 7]:
-            if st.button(
-                f"{reacted}  Dzień {day}",
-                key=f"grid_{day}",
-                use_container_width=True,
-                disabled=not unlocked,
-            ):
-                st.session_state.selected_day = day
-                st.session_state.show_history = False
-                st.rerun()
-
-        if (i % 7) == 6 and i != TOTAL_DAYS - 1:
-            cols = st.columns(7)
-
-def render_day_card(uid: str, prog: ProgressState, day: int) -> ProgressState:
-    data = DAYS[day - 1]
-    unlocked = is_unlocked(day)
+    page_days = range(first, last + 1)
+    unlocked = [day for day in page_days if clock.is_unlocked(day)]
+    locked = [day for day in page_days if not clock.is_unlocked(day)]
+    if unlocked:
+        reactions = prog.reaction_map()
+        st.pills(
+            "Dni",
+            options=unlocked,
+            format_func=lambda day: f"{reactions.get(day) or campaign.day(day).emoji}  Dzień {day}",
+            key="history_pick",
+            on_change=_pick_history_day,
+            label_visibility="collapsed",
+        )
+    if locked:
+        # bitmapa odblokowań to prefiks dni, więc zablokowane na stronie to ciągły zakres
+        label = f"Dzień {locked[0]}" if len(locked) == 1 else f"Dni {locked[0]}–{locked[-1]}"
+        st.caption(f"🔒 {label}: kolejny odblokuje się {clock.timeline.unlock_at[locked[0] - 1]:%Y-%m-%d %H:%M}")
+
+@traced()
+def render_day_card(uid: str, prog: ProgressState, campaign: Campaign, day: int, clock: Clock) -> ProgressState:
+    data = campaign.day(day)
+    unlocked = clock.is_unlocked(day)
 
     if not unlocked:
         st.markdown(
-            f"""
-            <div class="sdm-card">
-              <div class="sdm-h2">Dzień {day}: {data["title"]}</div>
-              <div class="sdm-task">
-                Ta karta jest jeszcze zablokowana — odblokowuje się jedna dziennie od {GLOBAL_START.isoformat()}.
-              </div>
-              <div class="sdm-meta">
-                <span class="sdm-pill">🔒 Zablokowana</span>
-                <span class="sdm-pill">Odblokowany dzień dziś: {active_day_global()}/{TOTAL_DAYS}</span>
-              </div>
-            </div>
-            """,
+            render_templates(campaign.id)["card_locked"][day - 1]
+            .replace("{active}", str(clock.active_day))
+            .replace("{unlock}", f"{clock.timeline.unlock_at[day - 1]:%Y-%m-%d %H:%M}"),
             unsafe_allow_html=True,
         )
         return prog
 
-    reacted = prog.reactions.get(day, data["emoji"])
-    is_done = day in prog.completed
-    is_fav = day in prog.favorites
+    reacted = prog.reaction(day, data.emoji)
+    is_done = prog.is_completed(day)
+    is_fav = prog.is_favorite(day)
 
+    tpl = render_templates(campaign.id)
     st.markdown(
-        f"""
-        <div class="sdm-card">
-          <div class="sdm-h2">Dzień {day}: {data["title"]}</div>
-          <div class="sdm-task">{data["task"]}</div>
-          <div class="sdm-meta">
-            <span class="sdm-pill">⏱️ {data["duration_min"]}–{data["duration_min"]+5} min</span>
-            <span class="sdm-pill">Reakcja: <b>{reacted}</b></span>
-            <span class="sdm-pill">{'✅ Ukończone' if is_done else '⬜ Do wykonania'}</span>
-            <span class="sdm-pill">{'❤️ Ulubione' if is_fav else '🤍 Ulubione'}</span>
-          </div>
-        </div>
-        """,
+        tpl["card_open"][day - 1]
+        + f'<span class="sdm-pill">Reakcja: <b>{reacted}</b></span>'
+        + f'<span class="sdm-pill">{"✅ Ukończone" if is_done else "⬜ Do wykonania"}</span>'
+        + f'<span class="sdm-pill">{"❤️ Ulubione" if is_fav else "🤍 Ulubione"}</span>'
+        + tpl["card_close"],
         unsafe_allow_html=True,
     )
 
     def persist():
-        if not _secrets_ok():
-            st.warning("Brak secrets GitHub — nie zapiszę zmian.")
-            return prog
-        try:
-            updated = save_progress(uid, prog)
-            st.toast("Zapisano", icon="✅")
-            return updated
-        except requests.HTTPError as e:
-            st.error(f"GitHub API error: {e}")
-            return prog
-        except Exception as e:
-            st.error(f"Błąd zapisu: {e}")
+        if not _storage_ok():
+            st.warning("Brak konfiguracji storage — nie zapiszę zmian.")
             return prog
+        # zapis zbiorczy (write-behind) — patrz flush_progress
+        queue_save(uid, prog)
+        return prog
 
     st.write("")
     a1, a2, a3, a4 = st.columns([1.1, 1, 1, 1.3])
 
     with a1:
         if st.button("Zapisz jako ukończone", use_container_width=True):
-            prog.completed.add(day)
+            prog.mark_completed(day)
             prog = persist()
-            st.rerun()
+            rerun_fragment()
 
     with a2:
         if st.button("❤️ / 🤍 Ulubione", use_container_width=True):
-            if is_fav:
-                prog.favorites.discard(day)
-            else:
-                prog.favorites.add(day)
+            prog.toggle_favorite(day)
             prog = persist()
-            st.rerun()
+            rerun_fragment()
 
     with a3:
-        emoji_options = ["🔥", "💋", "✨", "🖤", "⚡", "🕯️", "🌙", "🎭", "🍓", "🔓"]
-        idx = emoji_options.index(reacted) if reacted in emoji_options else 0
-        emoji = st.selectbox("Emoji reakcji", options=emoji_options, index=idx, key=f"react_{day}")
+        idx = REACTION_EMOJI.index(reacted) if reacted in REACTION_EMOJI else 0
+        emoji = st.selectbox("Emoji reakcji", options=REACTION_EMOJI, index=idx, key=f"react_{day}")
         if st.button("Zapisz reakcję", use_container_width=True):
-            prog.reactions[day] = emoji
+            prog.set_reaction(day, emoji)
             prog = persist()
-            st.rerun()
+            rerun_fragment()
 
     with a4:
         if st.button("Pokaż kolejny dzień", use_container_width=True):
-            st.session_state.selected_day = min(TOTAL_DAYS, day + 1)
-            st.rerun()
+            st.session_state.selected_day = min(campaign.total_days, day + 1)
+            rerun_fragment()
 
     return prog
 
-# =========================
-# MAIN
-# =========================
-def main():
-    st.markdown(CSS, unsafe_allow_html=True)
-
-    uid = ensure_uid()
-
-    prog = ProgressState(set(), set(), {}, None)
-    if _secrets_ok():
-        try:
-            prog = load_progress(uid)
-        except Exception as e:
-            st.error(f"Nie mogę pobrać progresu z GitHuba: {e}")
-
-    if "show_history" not in st.session_state:
-        st.session_state.show_history = False
-    if "selected_day" not in st.session_state:
-        st.session_state.selected_day = 1
-
-    render_sidebar(uid)
-
-    st.markdown('<div class="sdm-wrap">', unsafe_allow_html=True)
-    st.markdown("<div class='sdm-logo' style='font-size:44px;'>SeduceMe</div>", unsafe_allow_html=True)
-    st.markdown(
-        "<div class='sdm-subtitle'>Globalne odblokowanie od 1 stycznia 2026 — po dniu 14 wszystko odblokowane na stałe</div>",
-        unsafe_allow_html=True,
-    )
-
-    render_progress_bar()
+@st.fragment
+@traced()
+def render_main_view(uid: str, campaign: Campaign, clock: Clock):
+    """
+    Nawigacja + karta dnia / historia jako jeden fragment: kliknięcia w kartę i kafelki historii
+    przerysowują tylko ten fragment (bez CSS, ensure_uid, load_progress, sidebaru i nagłówka).
+    Karta i historia dzielą fragment, bo kafelek historii przełącza widok na kartę.
+    clock pochodzi z ostatniego pełnego przebiegu (spójnie z nagłówkiem); po północy wymuszamy pełny rerun.
+    """
+    if clock.expired():
+        st.rerun()
+    prog = session_progress(uid)
 
     top1, top2, top4 = st.columns([1, 1, 1.4])
     with top1:
         if st.button("Dzisiaj", use_container_width=True):
-            d = active_day_global()
+            d = clock.active_day
             st.session_state.selected_day = 1 if d == 0 else d
             st.session_state.show_history = False
-            st.rerun()
+            rerun_fragment()
     with top2:
         if st.button("Historia", use_container_width=True):
             st.session_state.show_history = True
-            st.rerun()
+            rerun_fragment()
     with top4:
         st.markdown(
             f"""
             <div style="text-align:right; padding-top:10px; color:rgba(255,255,255,.65); font-size:14px;">
-              Ukończone: <b>{len(prog.completed)}</b> / {TOTAL_DAYS}
+              Ukończone: <b>{prog.completed_count()}</b> / {campaign.total_days}
             </div>
             """,
             unsafe_allow_html=True,
         )
+        render_save_status(uid)
 
     st.write("")
 
     if st.session_state.show_history:
-        render_history(prog)
+        render_history(prog, campaign, clock)
     else:
         day = int(st.session_state.selected_day)
-        day = max(1, min(TOTAL_DAYS, day))
-        prog = render_day_card(uid, prog, day)
+        day = max(1, min(campaign.total_days, day))
+        render_day_card(uid, prog, campaign, day, clock)
+
+# =========================
+# Profil startu (STARTUP_PROFILE w secrets albo ?profile=1)
+# =========================
+_RUN_PHASES: dict[str, float] = {}  # app.py wykonuje się od nowa przy każdym rerunie -> świeże dla przebiegu
+
+@contextmanager
+def phase(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _RUN_PHASES[name] = (time.perf_counter() - t0) * 1000
+
+def profile_enabled() -> bool:
+    return bool(st.secrets.get("STARTUP_PROFILE", False)) or st.query_params.get("profile") == "1"
+
+@st.cache_resource
+def process_startup_profile(_phases: dict[str, float]) -> dict[str, float]:
+    """Fazy pierwszego przebiegu w procesie (zimny start) — zapamiętane na stałe."""
+    return dict(_phases)
+
+def record_startup_profile() -> None:
+    if "startup_profile" not in st.session_state:
+        st.session_state.startup_profile = dict(_RUN_PHASES)
+    process_startup_profile(_RUN_PHASES)
+
+def render_startup_profile() -> None:
+    def rows(phases: dict[str, float]) -> str:
+        return "\n".join(f"| {k} | {v:.1f} |" for k, v in phases.items())
+
+    with st.sidebar.expander("Profil startu", expanded=True):
+        st.markdown(
+            "**Importy (proces)**\n\n| moduł | ms |\n|---|---:|\n"
+            + rows({k: v * 1000 for k, v in IMPORT_TIMES.items()})
+        )
+        for title, phases in (
+            ("Zimny start procesu", process_startup_profile(_RUN_PHASES)),
+            ("Pierwszy przebieg sesji", st.session_state.startup_profile),
+            ("Ten przebieg", _RUN_PHASES),
+        ):
+            st.markdown(f"**{title}**\n\n| faza | ms |\n|---|---:|\n" + rows(phases))
+
+# =========================
+# Metryki (METRICS_PANEL w secrets albo ?metrics=1)
+# =========================
+def metrics_enabled() -> bool:
+    return bool(st.secrets.get("METRICS_PANEL", False)) or st.query_params.get("metrics") == "1"
+
+@st.fragment
+def render_metrics_panel():
+    with st.expander("Metryki", expanded=True):
+        rows = summary()
+        if rows:
+            st.markdown(
+                "| span | n | p50 | p95 | p99 | max | błędy |\n|---|---:|---:|---:|---:|---:|---:|\n"
+                + "\n".join(
+                    f"| {r['name']} | {r['count']} | {r['p50']:.1f} | {r['p95']:.1f} | {r['p99']:.1f} "
+                    f"| {r['max']:.1f} | {r['errors']} |"
+                    for r in rows
+                )
+            )
+            st.caption("czasy w ms, ostatnie spany całego procesu")
+
+        if RATE_LIMIT:
+            reset_in = max(0, int(RATE_LIMIT.get("reset", 0) - time.time()))
+            st.caption(
+                f"GitHub API: zostało {RATE_LIMIT.get('remaining', '?')}/{RATE_LIMIT.get('limit', '?')}, "
+                f"reset za {reset_in // 60} min"
+            )
+        cache = getattr(get_store(), "cache", None)
+        if cache is not None:
+            st.caption("Cache odczytów: " + ", ".join(f"{k} {v}" for k, v in cache.stats.items()))
+        warmer = get_cache_warmer()
+        if warmer is not None and warmer.stats["last"]:
+            st.caption(
+                f"Rozgrzewka: {warmer.stats['warmed']} rekordów "
+                f"{int(time.time() - warmer.stats['last']) // 60} min temu (błędy {warmer.stats['errors']})"
+            )
+        st.caption("Zapisy: " + ", ".join(f"{k} {v}" for k, v in MERGE_STATS.items()))
+
+        st.download_button(
+            "Pobierz spany (JSONL)",
+            data=export_jsonl(),
+            file_name="seduceme-spans.jsonl",
+            mime="application/x-ndjson",
+        )
+        if st.button("Odśwież"):
+            rerun_fragment()
+
+# =========================
+# MAIN
+# =========================
+def main():
+    st.markdown(load_css(), unsafe_allow_html=True)
+
+    with phase("ensure_uid"):
+        uid = ensure_uid()
+
+    if _storage_ok():
+        get_cache_warmer()  # raz na proces: wątek rozgrzewki
+        # wynik zapisu z tła (jeśli już jest) zanim sięgniemy po cache
+        poll_save(uid)
+        try:
+            with phase("load_progress"):
+                load_progress_cached(uid)
+        except RateLimited:
+            st.warning("GitHub chwilowo ogranicza liczbę zapytań — progres wczytamy za chwilę.")
+        except Exception as e:
+            st.error(f"Nie mogę pobrać progresu: {e}")
+
+        # poprzedni zapis się nie udał -> ponów od razu w tym przebiegu
+        entry = _save_queue().get(uid)
+        if entry and entry.get("status") == "error":
+            flush_progress(uid, force=True)
+
+    # kampania z rekordu uid (zapisana przy pierwszym zapisie) — od niej zależy treść i odblokowanie
+    prog = session_progress(uid)
+    campaign = campaign_of(prog)
+    if prog.campaign is None:
+        prog.campaign = campaign.id
+    ensure_personal_start(uid, prog, campaign)
+    clock = clock_snapshot(campaign, prog.start)
+
+    if "show_history" not in st.session_state:
+        st.session_state.show_history = False
+    if "selected_day" not in st.session_state:
+        st.session_state.selected_day = 1
+
+    with phase("templates"):
+        render_templates(campaign.id)  # raz na proces i kampanię; potem trafienie w cache
+
+    with phase("render_sidebar"), st.sidebar:
+        render_sidebar(uid, campaign, clock)
+
+    st.markdown('<div class="sdm-wrap">', unsafe_allow_html=True)
+    st.markdown(f"<div class='sdm-logo' style='font-size:44px;'>{campaign.title}</div>", unsafe_allow_html=True)
+    if campaign.subtitle:
+        st.markdown(f"<div class='sdm-subtitle'>{campaign.subtitle}</div>", unsafe_allow_html=True)
+
+    render_progress_bar(campaign, clock)
+
+    with phase("render_main_view"):
+        render_main_view(uid, campaign, clock)
 
     st.markdown("</div>", unsafe_allow_html=True)
 
+    _RUN_PHASES["suma faz"] = sum(_RUN_PHASES.values())
+    record_startup_profile()
+    if profile_enabled():
+        render_startup_profile()
+    if metrics_enabled():
+        with st.sidebar:
+            render_metrics_panel()
+
+IMPORT_TIMES.setdefault("app", time.perf_counter() - _APP_T0)
+
 if __name__ == "__main__":
     main()
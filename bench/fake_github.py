@@ -0,0 +1,228 @@
+# bench/fake_github.py
+# Lokalny zamiennik GitHub Contents API (tylko to, czego używa storage.py) do testów obciążeniowych.
+# - GET/PUT/DELETE /repos/{owner}/{repo}/contents/{path}: sha, ETag/If-None-Match (304), 409 przy złym sha
+# - GET /repos/{owner}/{repo}/tarball/{ref}: całe repo jako tar.gz (eksport, rozgrzewka cache)
+# - opóźnienie odpowiedzi (latency + jitter), losowe 409 (symulacja równoległego commita)
+# - limit zapytań w oknie czasowym z nagłówkami X-RateLimit-* i 403 po wyczerpaniu (jak GitHub)
+#
+# Samodzielnie (np. do ręcznego klikania w app.py z GITHUB_API_URL = "http://127.0.0.1:8765"):
+#   python bench/fake_github.py --port 8765 --latency-ms 120 --conflict-rate 0.05
+
+import argparse
+import base64
+import hashlib
+import io
+import itertools
+import json
+import random
+import re
+import tarfile
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENTS_RE = re.compile(r"^/repos/[^/]+/[^/]+/contents/([^?]+)")
+TARBALL_RE = re.compile(r"^/repos/([^/]+)/([^/]+)/tarball/")
+
+
+def blob_sha(raw: bytes) -> str:
+    """sha pliku jak w GitHub Contents API (sha obiektu blob w git)."""
+    return hashlib.sha1(b"blob %d\0" % len(raw) + raw).hexdigest()
+
+
+@dataclass
+class FakeConfig:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    conflict_rate: float = 0.0  # szansa, że poprawny PUT trafi na "cudzy" commit i dostanie 409
+    rate_limit: int = 0  # zapytań na okno; 0 = bez limitu
+    rate_window_s: float = 60.0
+    seed: int | None = None
+
+
+class FakeGitHub:
+    """Stan repo (path -> (treść, sha)) + liczniki zapytań. Bezpieczny dla wątków."""
+
+    def __init__(self, cfg: FakeConfig):
+        self.cfg = cfg
+        self.files: dict[str, tuple[bytes, str]] = {}
+        self.calls: Counter[str] = Counter()  # "GET 200", "PUT 409", ...
+        self.lock = threading.Lock()
+        self._rng = random.Random(cfg.seed)
+        self._foreign = itertools.count(1)
+        self._window_start = time.time()
+        self._window_used = 0
+
+    def reset_stats(self) -> None:
+        with self.lock:
+            self.calls.clear()
+
+    def _sleep(self) -> None:
+        with self.lock:
+            jitter = self._rng.uniform(0, self.cfg.jitter_ms)
+        delay = (self.cfg.latency_ms + jitter) / 1000
+        if delay > 0:
+            time.sleep(delay)
+
+    def _rate_headers(self, counts: bool) -> tuple[dict[str, str], bool]:
+        """Nagłówki limitu i czy zapytanie mieści się w limicie (304 go nie zużywa — counts=False)."""
+        if not self.cfg.rate_limit:
+            return {}, True
+        with self.lock:
+            now = time.time()
+            if now - self._window_start >= self.cfg.rate_window_s:
+                self._window_start, self._window_used = now, 0
+            allowed = self._window_used < self.cfg.rate_limit
+            if allowed and counts:
+                self._window_used += 1
+            remaining = self.cfg.rate_limit - self._window_used
+            reset = int(self._window_start + self.cfg.rate_window_s + 0.999)
+        headers = {
+            "X-RateLimit-Limit": str(self.cfg.rate_limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": str(reset),
+        }
+        return headers, allowed
+
+    def tarball(self, owner: str, repo: str) -> bytes:
+        buf = io.BytesIO()
+        with self.lock:
+            files = dict(self.files)
+        with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+            for path, (raw, _) in sorted(files.items()):
+                info = tarfile.TarInfo(f"{owner}-{repo}-fake/{path}")
+                info.size = len(raw)
+                tar.addfile(info, io.BytesIO(raw))
+        return buf.getvalue()
+
+    def handle(self, method: str, path: str, headers: dict[str, str], body: dict) -> tuple[int, object, dict[str, str]]:
+        """(status, dane JSON albo surowe bajty, nagłówki)."""
+        self._sleep()
+        t = TARBALL_RE.match(path)
+        if t and method == "GET":
+            rate, allowed = self._rate_headers(counts=True)
+            if not allowed:
+                return 403, {"message": "API rate limit exceeded"}, {**rate, "X-RateLimit-Remaining": "0"}
+            return 200, self.tarball(t.group(1), t.group(2)), {**rate, "Content-Type": "application/x-gzip"}
+        m = CONTENTS_RE.match(path)
+        if not m:
+            return 404, {"message": "Not Found"}, {}
+        file_path = m.group(1)
+
+        with self.lock:
+            current = self.files.get(file_path)
+        not_modified = method == "GET" and current is not None and headers.get("if-none-match") == f'"{current[1]}"'
+        rate, allowed = self._rate_headers(counts=not not_modified)
+        if not allowed:
+            return 403, {"message": "API rate limit exceeded"}, {**rate, "X-RateLimit-Remaining": "0"}
+
+        if method == "GET":
+            if current is None:
+                return 404, {"message": "Not Found"}, rate
+            if not_modified:
+                return 304, {}, {**rate, "ETag": f'"{current[1]}"'}
+            raw, sha = current
+            data = {"path": file_path, "sha": sha, "encoding": "base64", "content": base64.b64encode(raw).decode()}
+            return 200, data, {**rate, "ETag": f'"{sha}"'}
+
+        if method == "PUT":
+            raw = base64.b64decode(body.get("content", ""))
+            with self.lock:
+                current = self.files.get(file_path)
+                if current is not None and body.get("sha") != current[1]:
+                    return 409, {"message": f"{file_path} does not match {body.get('sha')}"}, rate
+                if current is None and body.get("sha"):
+                    return 422, {"message": "sha wasn't supplied"}, rate
+                if current is not None and self._rng.random() < self.cfg.conflict_rate:
+                    # ktoś inny zdążył zapisać ten sam plik: nowe sha, zapis klienta odrzucony
+                    foreign = blob_sha(current[0] + str(next(self._foreign)).encode())
+                    self.files[file_path] = (current[0], foreign)
+                    return 409, {"message": f"{file_path} does not match {body.get('sha')}"}, rate
+                sha = blob_sha(raw)
+                if current is not None and current[1] == sha:
+                    sha = blob_sha(raw + str(next(self._foreign)).encode())
+                self.files[file_path] = (raw, sha)
+            return (200 if current else 201), {"content": {"path": file_path, "sha": sha}}, rate
+
+        if method == "DELETE":
+            with self.lock:
+                current = self.files.get(file_path)
+                if current is None:
+                    return 404, {"message": "Not Found"}, rate
+                if body.get("sha") != current[1]:
+                    return 409, {"message": "sha mismatch"}, rate
+                del self.files[file_path]
+            return 200, {"commit": {}}, rate
+
+        return 405, {"message": "Method Not Allowed"}, rate
+
+
+def make_handler(fake: FakeGitHub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive jak api.github.com
+
+        def _serve(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+            headers = {k.lower(): v for k, v in self.headers.items()}
+            status, data, extra = fake.handle(self.command, self.path, headers, body)
+            with fake.lock:
+                fake.calls[f"{self.command} {status}"] += 1
+            if isinstance(data, bytes):
+                payload = data
+            else:
+                payload = b"" if status == 304 else json.dumps(data).encode()
+                extra = {"Content-Type": "application/json; charset=utf-8", **extra}
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(payload)))
+            for k, v in extra.items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        do_GET = do_PUT = do_DELETE = _serve
+
+        def log_message(self, format, *args):  # noqa: A002 — sygnatura z BaseHTTPRequestHandler
+            pass
+
+    return Handler
+
+
+def serve(cfg: FakeConfig, host: str = "127.0.0.1", port: int = 0) -> tuple[ThreadingHTTPServer, FakeGitHub]:
+    """Uruchamia serwer w wątku w tle; port 0 = dowolny wolny (adres: server.server_address)."""
+    fake = FakeGitHub(cfg)
+    server = ThreadingHTTPServer((host, port), make_handler(fake))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-github", daemon=True).start()
+    return server, fake
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Lokalny zamiennik GitHub Contents API.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--conflict-rate", type=float, default=0.0)
+    ap.add_argument("--rate-limit", type=int, default=0, help="zapytań na okno (0 = bez limitu)")
+    ap.add_argument("--rate-window", type=float, default=60.0, help="długość okna limitu w s")
+    args = ap.parse_args(argv)
+
+    cfg = FakeConfig(args.latency_ms, args.jitter_ms, args.conflict_rate, args.rate_limit, args.rate_window)
+    server, fake = serve(cfg, args.host, args.port)
+    print(f"fake GitHub API: http://{args.host}:{server.server_address[1]}  (Ctrl+C kończy)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        print(dict(fake.calls))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,242 @@
+# bench/load_test.py
+# Test obciążeniowy app.py bez prawdziwego GitHuba: N sesji AppTest klika w kartę dnia
+# i historię, a storage rozmawia z bench/fake_github.py (prawdziwe HTTP na localhost).
+#
+# AppTest podmienia globalny Runtime na czas przebiegu, więc w jednym procesie przebiegi nie mogą
+# iść równolegle: sesje są rozdzielane na --procs procesów (jak kilka replik serwera), a w procesie
+# przeplatane po jednej akcji (round-robin). Zapisy w tle (SaveWorker) i tak idą równolegle.
+#
+# Przykłady:
+#   python bench/load_test.py                                  # 8 sesji x 20 akcji, bez opóźnień
+#   python bench/load_test.py --sessions 32 --latency-ms 150 --jitter-ms 100 --conflict-rate 0.05
+#   python bench/load_test.py --rate-limit 200 --rate-window 10 --json after.json --baseline before.json
+#
+# Raport: przepustowość (akcje/s), p50/p95/p99 czasu akcji (pełny przebieg AppTest, także
+# rerun fragmentu), zapytania API na akcję (po metodzie i statusie) i spany z tracing.py.
+# Sesje w jednym procesie dzielą cache_resource (store, cache odczytów, pulę zapisów) — jak na serwerze.
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import tracing  # noqa: E402
+from bench.fake_github import FakeConfig, serve  # noqa: E402
+
+APP = os.path.join(ROOT, "app.py")
+ACTIONS = ("complete", "favorite", "reaction", "next_day", "today", "history", "grid")
+
+
+def _button(at: AppTest, label: str):
+    for b in at.button:
+        if b.label == label:
+            return b
+    return None
+
+
+def do_action(at: AppTest, action: str, rng: random.Random) -> str:
+    """Wykonuje akcję (klik + przebieg). Zwraca nazwę faktycznie wykonanej akcji."""
+    in_history = bool(at.session_state["show_history"])
+    if action == "grid" and not in_history:
+        action = "history"
+    if action in ("complete", "favorite", "reaction", "next_day") and in_history:
+        action = "grid"
+
+    if action == "grid":
+        grid = at.pills[0]
+        grid.set_value(rng.randint(1, len(grid.proto.options))).run()
+    elif action == "reaction":
+        box = at.selectbox[0]
+        box.select(rng.choice(box.options)).run()
+        _button(at, "Zapisz reakcję").click().run()
+    else:
+        label = {
+            "complete": "Zapisz jako ukończone",
+            "favorite": "❤️ / 🤍 Ulubione",
+            "next_day": "Pokaż kolejny dzień",
+            "today": "Dzisiaj",
+            "history": "Historia",
+        }[action]
+        _button(at, label).click().run()
+    return action
+
+
+def is_saved(at: AppTest) -> bool:
+    queue = at.session_state["save_queue"] if "save_queue" in at.session_state else {}
+    return all(e.get("touched") is None and e.get("ticket") is None for e in queue.values())
+
+
+def drain_spans(out: dict[str, list[float]]) -> None:
+    while tracing.SPANS:
+        s = tracing.SPANS.popleft()
+        out.setdefault(s["name"], []).append(s["ms"])
+
+
+def run_worker(first: int, count: int, args, secrets: dict) -> dict:
+    """Jeden proces: `count` sesji przeplatanych akcja po akcji. Zwraca surowe próbki."""
+    samples: list[tuple[str, float]] = []
+    spans: dict[str, list[float]] = {}
+    sessions = []
+    for i in range(first, first + count):
+        at = AppTest.from_file(APP, default_timeout=args.timeout)
+        for k, v in secrets.items():
+            at.secrets[k] = v
+        at.query_params["uid"] = f"bench-{i:04d}"
+        t0 = time.perf_counter()
+        at.run()
+        samples.append(("open", (time.perf_counter() - t0) * 1000))
+        sessions.append((i, at, random.Random(args.seed * 1000 + i)))
+
+    for _ in range(args.actions):
+        for i, at, rng in sessions:
+            t0 = time.perf_counter()
+            name = do_action(at, rng.choice(ACTIONS), rng)
+            samples.append((name, (time.perf_counter() - t0) * 1000))
+            if at.exception:
+                raise RuntimeError(f"sesja {i}: {at.exception[0].message}")
+        drain_spans(spans)
+
+    # zapis po debounce; timer fragmentu autosave w AppTest nie tyka sam, więc robimy przebiegi
+    t0 = time.perf_counter()
+    pending = [at for _, at, _ in sessions]
+    deadline = time.monotonic() + args.timeout
+    while pending and time.monotonic() < deadline:
+        time.sleep(0.25)
+        for at in pending:
+            at.run()
+        pending = [at for at in pending if not is_saved(at)]
+    samples.append(("flush", (time.perf_counter() - t0) * 1000))
+    drain_spans(spans)
+    return {"samples": samples, "spans": spans, "unsaved": len(pending)}
+
+
+def stats(values: list[float]) -> dict:
+    values = sorted(values)
+    return {
+        "n": len(values),
+        "p50": round(tracing.percentile(values, 50), 2),
+        "p95": round(tracing.percentile(values, 95), 2),
+        "p99": round(tracing.percentile(values, 99), 2),
+        "max": round(values[-1], 2) if values else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Test obciążeniowy SeduceMe na lokalnym fake GitHub API.")
+    ap.add_argument("--sessions", type=int, default=8)
+    ap.add_argument("--actions", type=int, default=20, help="akcji na sesję")
+    ap.add_argument("--procs", type=int, default=min(4, os.cpu_count() or 1), help="procesy z sesjami")
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--conflict-rate", type=float, default=0.0)
+    ap.add_argument("--rate-limit", type=int, default=0)
+    ap.add_argument("--rate-window", type=float, default=60.0)
+    ap.add_argument("--layout", choices=["file", "sharded"], default="file")
+    ap.add_argument("--fixed-now", default="2026-01-15T12:00", help="APP_FIXED_NOW (domyślnie wszystko odblokowane)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--timeout", type=float, default=120.0, help="limit na jeden przebieg AppTest (s)")
+    ap.add_argument("--json", metavar="FILE", help="zapisz raport jako JSON")
+    ap.add_argument("--baseline", metavar="FILE", help="porównaj z wcześniejszym raportem JSON")
+    args = ap.parse_args(argv)
+
+    cfg = FakeConfig(args.latency_ms, args.jitter_ms, args.conflict_rate, args.rate_limit, args.rate_window, args.seed)
+    server, fake = serve(cfg)
+    secrets = {
+        "GITHUB_TOKEN": "bench",
+        "GITHUB_REPO": "bench/seduceme",
+        "GITHUB_API_URL": f"http://127.0.0.1:{server.server_address[1]}",
+        "STORAGE_LAYOUT": args.layout,
+        "APP_FIXED_NOW": args.fixed_now,
+    }
+
+    procs = max(1, min(args.procs, args.sessions))
+    split = [args.sessions // procs + (p < args.sessions % procs) for p in range(procs)]
+    firsts = [sum(split[:p]) for p in range(procs)]
+    workdir = tempfile.mkdtemp(prefix="seduceme-bench-")  # dziennik zapisów: osobny plik na proces
+    t0 = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(procs, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [
+                pool.submit(run_worker, firsts[p], split[p], args,
+                            {**secrets, "JOURNAL_PATH": os.path.join(workdir, f"journal-{p}.ndjson")})
+                for p in range(procs)
+            ]
+            results = [f.result() for f in futures]
+    finally:
+        wall = time.perf_counter() - t0
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    by_action: dict[str, list[float]] = {}
+    spans: dict[str, list[float]] = {}
+    for r in results:
+        for name, ms in r["samples"]:
+            by_action.setdefault(name, []).append(ms)
+        for name, values in r["spans"].items():
+            spans.setdefault(name, []).extend(values)
+    user_actions = sum(len(v) for k, v in by_action.items() if k not in ("open", "flush"))
+    api_calls = sum(fake.calls.values())
+
+    report = {
+        "config": {k: v for k, v in vars(args).items() if k not in ("json", "baseline")},
+        "wall_s": round(wall, 3),
+        "actions": user_actions,
+        "throughput_actions_per_s": round(user_actions / wall, 2),
+        "unsaved_sessions": sum(r["unsaved"] for r in results),
+        "api_calls": api_calls,
+        "api_calls_per_action": round(api_calls / max(1, user_actions), 3),
+        "api_calls_by_status": dict(sorted(fake.calls.items())),
+        "latency_ms": {k: stats(v) for k, v in sorted(by_action.items())},
+        "latency_ms_all_actions": stats([ms for k, v in by_action.items() if k not in ("open", "flush") for ms in v]),
+        "spans_ms": {name: stats(values) for name, values in sorted(spans.items())},
+    }
+
+    print_report(report)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            print_comparison(json.load(f), report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0 if report["unsaved_sessions"] == 0 else 1
+
+
+def print_report(r: dict) -> None:
+    c = r["config"]
+    print(f"sesje {c['sessions']} x akcje {c['actions']} w {c['procs']} procesach, layout {c['layout']}, "
+          f"latency {c['latency_ms']}±{c['jitter_ms']} ms, 409 {c['conflict_rate']}, limit {c['rate_limit']}/{c['rate_window']}s")
+    print(f"czas {r['wall_s']} s, {r['actions']} akcji, {r['throughput_actions_per_s']} akcji/s, "
+          f"niezapisane sesje: {r['unsaved_sessions']}")
+    print(f"API: {r['api_calls']} zapytań, {r['api_calls_per_action']} na akcję  {r['api_calls_by_status']}")
+    print(f"\n{'akcja':<16}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}   (ms)")
+    for name, s in {**r["latency_ms"], "(wszystkie)": r["latency_ms_all_actions"]}.items():
+        print(f"{name:<16}{s['n']:>6}{s['p50']:>10.1f}{s['p95']:>10.1f}{s['p99']:>10.1f}{s['max']:>10.1f}")
+    print(f"\n{'span':<22}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}   (ms)")
+    for name, s in r["spans_ms"].items():
+        print(f"{name:<22}{s['n']:>6}{s['p50']:>10.1f}{s['p95']:>10.1f}{s['p99']:>10.1f}{s['max']:>10.1f}")
+
+
+def print_comparison(base: dict, r: dict) -> None:
+    def delta(a: float, b: float) -> str:
+        return f"{a} -> {b}" + (f" ({(b - a) / a * 100:+.0f}%)" if a else "")
+
+    print("\nwzględem baseline:")
+    print(f"  akcji/s        {delta(base['throughput_actions_per_s'], r['throughput_actions_per_s'])}")
+    print(f"  API na akcję   {delta(base['api_calls_per_action'], r['api_calls_per_action'])}")
+    for q in ("p50", "p95", "p99"):
+        print(f"  {q} akcji      {delta(base['latency_ms_all_actions'][q], r['latency_ms_all_actions'][q])}")
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
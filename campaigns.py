@@ -0,0 +1,177 @@
+# campaigns.py
+# Kampanie (treść dni + harmonogram odblokowania) wczytywane z plików campaigns/*.json.
+# Plik kampanii:
+# {"id", "title", "subtitle", "start": "RRRR-MM-DD", "tz": "Europe/Warsaw" (opcjonalnie),
+#  "unlock": "global" | "personal" (opcjonalnie, domyślnie global),
+#  "days": [{"day": 1, "title", "task", "emoji", "duration_min"}, ...]}
+#
+# Odblokowanie:
+# - global: dzień d o północy (strefa kampanii) dnia start + d - 1 — dla wszystkich naraz
+# - personal: uid dostaje własny start (chwila pierwszej wizyty, zapisana w rekordzie jako "start");
+#   dzień d odblokowuje się o tej samej godzinie d - 1 dób później — nowe karty rozkładają się na całą dobę
+# Harmonogram uid to Timeline: krotka chwil odblokowania liczona raz na (kampania, start) w procesie.
+#
+# Pliki są parsowane i walidowane raz na proces (app.py trzyma wynik w st.cache_resource);
+# Campaign jest niezmienna, a dzień to indeks w krotce — O(1) bez przeszukiwania listy.
+
+import bisect
+import functools
+import json
+import os
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+CAMPAIGNS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "campaigns")
+# rekordy bez pola "campaign" (sprzed kampanii) należą do pierwszej kampanii
+LEGACY_CAMPAIGN_ID = "seduceme-2026"
+DEFAULT_TZ = "Europe/Warsaw"
+UNLOCK_MODES = ("global", "personal")
+
+
+class CampaignError(ValueError):
+    """Niepoprawny plik kampanii."""
+
+
+@dataclass(frozen=True)
+class Day:
+    day: int
+    title: str
+    task: str
+    emoji: str
+    duration_min: int
+
+
+@dataclass(frozen=True)
+class Campaign:
+    id: str
+    title: str
+    subtitle: str
+    start: date
+    tz: ZoneInfo
+    days: tuple[Day, ...]
+    unlock: str = "global"
+
+    @property
+    def total_days(self) -> int:
+        return len(self.days)
+
+    @property
+    def personal(self) -> bool:
+        return self.unlock == "personal"
+
+    def day(self, n: int) -> Day:
+        return self.days[n - 1]
+
+    def personal_start(self, now: datetime) -> datetime:
+        """Start uid dołączającego teraz (z dokładnością do minuty); nie wcześniej niż start kampanii."""
+        opening = datetime.combine(self.start, datetime.min.time(), tzinfo=self.tz)
+        return max(now.astimezone(self.tz).replace(second=0, microsecond=0), opening)
+
+
+@dataclass(frozen=True)
+class Timeline:
+    """Chwile odblokowania kolejnych dni (unlock_at[d - 1] = dzień d)."""
+
+    unlock_at: tuple[datetime, ...]
+
+    def active_day(self, now: datetime) -> int:
+        """Ostatni odblokowany dzień (0 = przed startem); po ostatnim dniu wszystko zostaje odblokowane."""
+        return bisect.bisect_right(self.unlock_at, now)
+
+    def next_unlock(self, now: datetime) -> datetime | None:
+        """Chwila odblokowania kolejnego dnia (None = wszystko już odblokowane)."""
+        active = self.active_day(now)
+        return self.unlock_at[active] if active < len(self.unlock_at) else None
+
+
+@functools.lru_cache(maxsize=4096)
+def unlock_timeline(campaign: Campaign, start: str | None = None) -> Timeline:
+    """
+    Harmonogram uid: start z rekordu (ISO 8601) albo — bez niego / przy złym formacie — start kampanii.
+    Liczony raz na (kampania, start); kolejne przebiegi robią tylko bisect.
+    Kolejne dni liczone w czasie lokalnym kampanii (ta sama godzina także po zmianie czasu).
+    """
+    first = None
+    if start:
+        try:
+            first = datetime.fromisoformat(start)
+        except ValueError:
+            first = None
+    if first is None or first.tzinfo is None:
+        first = datetime.combine(campaign.start, datetime.min.time(), tzinfo=campaign.tz)
+    first = first.astimezone(campaign.tz)
+    return Timeline(tuple(
+        datetime.combine(first.date() + timedelta(days=i), first.time(), tzinfo=campaign.tz)
+        for i in range(campaign.total_days)
+    ))
+
+
+def _require(obj: dict, key: str, kind, where: str):
+    value = obj.get(key)
+    if not isinstance(value, kind) or isinstance(value, bool) or (isinstance(value, str) and not value.strip()):
+        raise CampaignError(f"{where}: pole {key!r} jest wymagane ({kind.__name__})")
+    return value
+
+
+def parse_campaign(obj: dict, where: str = "kampania") -> Campaign:
+    cid = _require(obj, "id", str, where)
+    where = f"{where} ({cid})"
+    try:
+        start = date.fromisoformat(_require(obj, "start", str, where))
+    except ValueError as e:
+        raise CampaignError(f"{where}: zła data start: {e}") from None
+    try:
+        tz = ZoneInfo(obj.get("tz") or DEFAULT_TZ)
+    except (ZoneInfoNotFoundError, ValueError) as e:
+        raise CampaignError(f"{where}: nieznana strefa czasowa {obj.get('tz')!r}") from e
+    unlock = obj.get("unlock") or "global"
+    if unlock not in UNLOCK_MODES:
+        raise CampaignError(f"{where}: unlock musi być jednym z {UNLOCK_MODES} (jest {unlock!r})")
+
+    raw_days = _require(obj, "days", list, where)
+    if not raw_days:
+        raise CampaignError(f"{where}: brak dni")
+    days = []
+    for i, d in enumerate(raw_days, start=1):
+        if not isinstance(d, dict):
+            raise CampaignError(f"{where}: dzień {i} nie jest obiektem")
+        if d.get("day") != i:
+            raise CampaignError(f"{where}: dni muszą być numerowane kolejno od 1 (pozycja {i}: {d.get('day')!r})")
+        dw = f"{where} dzień {i}"
+        duration = _require(d, "duration_min", int, dw)
+        if duration <= 0:
+            raise CampaignError(f"{dw}: duration_min musi być > 0")
+        days.append(Day(i, _require(d, "title", str, dw), _require(d, "task", str, dw),
+                        _require(d, "emoji", str, dw), duration))
+
+    return Campaign(
+        id=cid,
+        title=_require(obj, "title", str, where),
+        subtitle=str(obj.get("subtitle") or ""),
+        start=start,
+        tz=tz,
+        days=tuple(days),
+        unlock=unlock,
+    )
+
+
+def load_campaigns(directory: str = CAMPAIGNS_DIR) -> dict[str, Campaign]:
+    """Wszystkie campaigns/*.json; błąd w którymkolwiek pliku albo powtórzone id -> CampaignError."""
+    out: dict[str, Campaign] = {}
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            with open(path, encoding="utf-8") as f:
+                obj = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CampaignError(f"{name}: {e}") from e
+        campaign = parse_campaign(obj, where=name)
+        if campaign.id in out:
+            raise CampaignError(f"{name}: powtórzone id kampanii {campaign.id!r}")
+        out[campaign.id] = campaign
+    if not out:
+        raise CampaignError(f"brak kampanii w {directory}")
+    return out
@@ -0,0 +1,117 @@
+# export_progress.py
+# Eksport / analityka progresu wszystkich par (bez Streamlit).
+#
+# Przykłady:
+#   python export_progress.py --local .                  # lokalna kopia repo (katalog progress/)
+#   python export_progress.py                            # backend z .streamlit/secrets.toml
+#   python export_progress.py --format csv -o stats.csv
+#   python export_progress.py --campaign <id>            # inna kampania (domyślnie pierwsza)
+#
+# Wynik (domyślnie JSON kolumnowy): jedna kolumna na metrykę, jeden wiersz na dzień —
+# liczba ukończeń, ulubionych i rozkład reakcji (emoji) per dzień.
+
+import argparse
+import csv
+import json
+import sys
+import tomllib
+
+from campaigns import CAMPAIGNS_DIR, LEGACY_CAMPAIGN_ID, load_campaigns
+from storage import (
+    http_background,
+    iter_local_records,
+    mask_days,
+    record_reactions,
+    store_from_config,
+    upgrade_record,
+)
+
+
+def aggregate(records, total_days: int, campaign: str = LEGACY_CAMPAIGN_ID) -> dict:
+    """Jeden przebieg po rekordach kampanii; pamięć zależy od liczby dni i emoji, nie od liczby par."""
+    completed = [0] * total_days
+    favorites = [0] * total_days
+    reactions: dict[str, list[int]] = {}
+    users = 0
+    finished = 0
+    full = (1 << total_days) - 1
+
+    for obj in records:
+        rec = upgrade_record(obj)  # rekordy v1 i v2
+        if (rec.get("campaign") or LEGACY_CAMPAIGN_ID) != campaign:
+            continue
+        users += 1
+        done, fav = rec.get("c", 0) & full, rec.get("f", 0) & full
+        if done.bit_count() == total_days:
+            finished += 1
+        for day in mask_days(done):
+            completed[day - 1] += 1
+        for day in mask_days(fav):
+            favorites[day - 1] += 1
+        for day, emoji in record_reactions(rec).items():
+            if day <= total_days:
+                reactions.setdefault(emoji, [0] * total_days)[day - 1] += 1
+
+    return {
+        "campaign": campaign,
+        "users": users,
+        "finished_all": finished,
+        "columns": {
+            "day": list(range(1, total_days + 1)),
+            "completed": completed,
+            "favorites": favorites,
+            "reactions": dict(sorted(reactions.items())),
+        },
+    }
+
+
+def write_csv(stats: dict, out) -> None:
+    cols = stats["columns"]
+    emojis = list(cols["reactions"])
+    w = csv.writer(out)
+    w.writerow(["day", "completed", "favorites", *[f"reaction:{e}" for e in emojis]])
+    for i, day in enumerate(cols["day"]):
+        w.writerow([day, cols["completed"][i], cols["favorites"][i], *[cols["reactions"][e][i] for e in emojis]])
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Zbiorcze statystyki progresu SeduceMe.")
+    ap.add_argument("--local", metavar="DIR", help="czytaj z lokalnej kopii repo / katalogu progress/")
+    ap.add_argument("--secrets", default=".streamlit/secrets.toml", help="konfiguracja backendu (jak w app.py)")
+    ap.add_argument("--campaign", default=LEGACY_CAMPAIGN_ID, help="id kampanii (liczba dni z jej pliku)")
+    ap.add_argument("--campaigns-dir", default=CAMPAIGNS_DIR)
+    ap.add_argument("--format", choices=["json", "csv"], default="json")
+    ap.add_argument("-o", "--output", help="plik wynikowy (domyślnie stdout)")
+    args = ap.parse_args(argv)
+
+    campaigns = load_campaigns(args.campaigns_dir)
+    if args.campaign not in campaigns:
+        ap.error(f"nieznana kampania {args.campaign!r} (są: {', '.join(campaigns)})")
+
+    if args.local:
+        records = iter_local_records(args.local)
+    else:
+        with open(args.secrets, "rb") as f:
+            store = store_from_config(tomllib.load(f))
+        if store is None:
+            ap.error(f"brak konfiguracji storage w {args.secrets}")
+        records = store.iter_records()
+
+    with http_background():  # eksport wsadowy może czekać na reset limitu GitHub
+        stats = aggregate(records, campaigns[args.campaign].total_days, args.campaign)
+
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        if args.format == "csv":
+            write_csv(stats, out)
+        else:
+            json.dump(stats, out, ensure_ascii=False, separators=(",", ":"))
+            out.write("\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
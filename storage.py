@@ -0,0 +1,1490 @@
+# storage.py
+# Magazyny progresu (backendy) dla app.py.
+# - GitHubContentsStore: plik progress/{uid}.json w repo (Contents API) — dotychczasowe zachowanie
+# - SQLiteStore: lokalna baza SQLite (WAL), jeden wiersz na uid
+#
+# Rekord to dict w formacie pliku progress/{uid}.json (schema_version 2, zwarty JSON):
+# {"uid", "updated_at", "schema_version": 2, "c": maska ukończonych, "f": maska ulubionych,
+#  "r": indeksy reakcji per dzień, opcjonalnie "rx": reakcje spoza REACTION_EMOJI,
+#  "campaign": id kampanii (campaigns.py; brak = LEGACY_CAMPAIGN_ID),
+#  opcjonalnie "start": własny start odblokowania uid (ISO 8601 z offsetem; brak = start kampanii)}
+# Bit d-1 maski = dzień d. Rekordy v1 ({"completed": [...], "favorites": [...], "reactions": {...}})
+# są czytane przez upgrade_record — każdy odczyt rekordu przechodzi przez nie.
+# Wersja rekordu (sha na GitHub / rewizja w SQLite) służy do wykrywania konfliktów.
+#
+# Moduł jest importowany (a nie wykonywany przy każdym rerunie jak app.py),
+# więc stan trzymany tutaj żyje przez cały proces serwera.
+#
+# Ciężkie zależności (requests, tarfile) są ładowane dopiero przy pierwszym użyciu —
+# backend SQLite i zimny start bez zapytań HTTP ich nie potrzebują.
+# Pełny rozkład importów: python -X importtime -c "import storage"
+
+from __future__ import annotations
+
+import time
+
+_IMPORT_T0 = time.perf_counter()
+
+import base64
+import copy
+import hashlib
+import itertools
+import json
+import os
+import random
+import importlib
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict, deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from tracing import IMPORT_TIMES, span
+
+if TYPE_CHECKING:
+    import requests
+
+def lazy_import(name: str):
+    """Import przy pierwszym użyciu; czas pierwszego importu trafia do IMPORT_TIMES."""
+    mod = sys.modules.get(name)
+    if mod is None:
+        t0 = time.perf_counter()
+        mod = importlib.import_module(name)
+        IMPORT_TIMES[name] = time.perf_counter() - t0
+    return mod
+
+
+class ProgressStore:
+    """Interfejs magazynu progresu."""
+
+    name = "base"
+    rate_limited = False  # zapisy liczą się do limitu zapytań (SaveWorker dozuje je przez WriteLimiter)
+
+    def load(self, uid: str) -> tuple[dict | None, str | None]:
+        """Zwraca (rekord, wersja) albo (None, None), gdy uid nie ma zapisu."""
+        raise NotImplementedError
+
+    def save_if(self, uid: str, obj: dict, version: str | None) -> str | None:
+        """
+        Zapisuje rekord tylko, jeśli wersja w storage == version (None = rekordu nie ma).
+        Zwraca nową wersję; przy niezgodności rzuca VersionConflict.
+        """
+        raise NotImplementedError
+
+    def save(self, uid: str, obj: dict, version: str | None, base: dict | None = None) -> tuple[str | None, dict]:
+        """
+        Zapis z optymistyczną kontrolą wersji. Przy konflikcie pobiera aktualny rekord, scala go
+        trójstronnie z naszym (merge_records; base = stan, od którego zaczęliśmy zmiany) i ponawia
+        z backoffem, najwyżej MERGE_MAX_RETRIES razy. Zwraca (nowa wersja, faktycznie zapisany rekord).
+        """
+        _count("saves")
+        for attempt in range(MERGE_MAX_RETRIES + 1):
+            try:
+                return self.save_if(uid, obj, version), obj
+            except VersionConflict:
+                _count("conflicts" if attempt == 0 else "retries")
+                if attempt == MERGE_MAX_RETRIES:
+                    break
+                if attempt:
+                    time.sleep(MERGE_BACKOFF_BASE_S * (2 ** attempt) * random.random())
+                theirs, version = self.load(uid)
+                obj = merge_records(base, obj, theirs)
+                base = theirs
+        _count("failed")
+        raise VersionConflict(f"{uid}: konflikt wersji po {MERGE_MAX_RETRIES} próbach scalenia")
+
+    def delete(self, uid: str) -> None:
+        raise NotImplementedError
+
+    def describe(self, uid: str) -> list[str]:
+        """Linie do pokazania w sidebarze."""
+        return [f"Storage: {self.name}"]
+
+    def iter_records(self) -> Iterator[dict]:
+        """Wszystkie rekordy (eksport/analityka)."""
+        raise NotImplementedError
+
+    def iter_versions(self) -> Iterator[tuple[str, dict, str | None]]:
+        """Wszystkie rekordy jako (uid, rekord, wersja) — ta sama wersja, którą zwróciłby load (CacheWarmer)."""
+        raise NotImplementedError
+
+
+def progress_path(uid: str) -> str:
+    return f"progress/{uid}.json"
+
+
+# =========================
+# Kodowanie rekordu (schema_version 2)
+# =========================
+SCHEMA_VERSION = 2
+
+# Tabela reakcji: w rekordzie zapisany jest indeks + 1 (znak base36, "0" = brak reakcji).
+# Tylko dopisywać na końcu — zmiana kolejności zmienia znaczenie zapisanych rekordów.
+REACTION_EMOJI = ("🔥", "💋", "✨", "🖤", "⚡", "🕯️", "🌙", "🎭", "🍓", "🔓")
+_REACTION_CODES = "0123456789abcdefghijklmnopqrstuvwxyz"
+_REACTION_INDEX = {e: i + 1 for i, e in enumerate(REACTION_EMOJI)}
+
+
+def days_mask(days) -> int:
+    """Lista dni (int albo str, v1) -> maska bitowa; wartości spoza 1.. są pomijane."""
+    mask = 0
+    for x in days or []:
+        if str(x).isdigit() and int(x) >= 1:
+            mask |= 1 << (int(x) - 1)
+    return mask
+
+
+def mask_days(mask: int) -> list[int]:
+    return [i + 1 for i in range(mask.bit_length()) if mask >> i & 1]
+
+
+def encode_reactions(reactions: dict[int, str]) -> tuple[str, dict[str, str]]:
+    """dzień -> emoji  =>  (znaki per dzień, reakcje spoza tabeli jako {"dzień": emoji})."""
+    codes: list[str] = []
+    extra: dict[str, str] = {}
+    for day, emoji in sorted(reactions.items()):
+        if day < 1 or not emoji:
+            continue
+        idx = _REACTION_INDEX.get(emoji)
+        if idx is None:
+            extra[str(day)] = emoji
+            continue
+        codes.extend("0" * (day - len(codes)))
+        codes[day - 1] = _REACTION_CODES[idx]
+    return "".join(codes), extra
+
+
+def decode_reactions(codes: str, extra: dict | None = None) -> dict[int, str]:
+    out: dict[int, str] = {}
+    for i, ch in enumerate(codes or ""):
+        idx = _REACTION_CODES.find(ch)
+        if 0 < idx <= len(REACTION_EMOJI):
+            out[i + 1] = REACTION_EMOJI[idx - 1]
+    for k, v in (extra or {}).items():
+        if str(k).isdigit() and int(k) >= 1 and isinstance(v, str) and v.strip():
+            out[int(k)] = v
+    return out
+
+
+def upgrade_record(obj: dict) -> dict:
+    """Dowolna wersja rekordu -> schema_version 2 (rekord v2 zwracany bez kopiowania)."""
+    if obj.get("schema_version") == SCHEMA_VERSION:
+        return obj
+    raw = obj.get("reactions")
+    reactions = {}
+    if isinstance(raw, dict):
+        reactions = {int(k): v for k, v in raw.items() if str(k).isdigit() and isinstance(v, str) and v.strip()}
+    return make_record(obj.get("uid"), obj.get("updated_at"), days_mask(obj.get("completed")),
+                       days_mask(obj.get("favorites")), *encode_reactions(reactions), campaign=obj.get("campaign"),
+                       start=obj.get("start"))
+
+
+def make_record(uid: str | None, updated_at: str | None, completed: int, favorites: int,
+                reactions: str, extra: dict[str, str] | None = None, campaign: str | None = None,
+                start: str | None = None) -> dict:
+    rec = {"uid": uid, "updated_at": updated_at, "schema_version": SCHEMA_VERSION,
+           "c": completed, "f": favorites, "r": reactions}
+    if extra:
+        rec["rx"] = extra
+    if campaign:
+        rec["campaign"] = campaign
+    if start:
+        rec["start"] = start
+    return rec
+
+
+def record_reactions(rec: dict) -> dict[int, str]:
+    """dzień -> emoji z rekordu v2."""
+    return decode_reactions(rec.get("r", ""), rec.get("rx"))
+
+
+def dump_record(rec: dict) -> bytes:
+    return json.dumps(rec, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+# =========================
+# Konflikty: scalanie trójstronne
+# =========================
+class VersionConflict(Exception):
+    """Ktoś inny zapisał rekord po tym, jak go wczytaliśmy."""
+
+
+class RateLimited(Exception):
+    """Backend odrzucił zapis z powodu limitu zapytań; retry_at = najwcześniejsza sensowna próba (epoch)."""
+
+    def __init__(self, retry_at: float):
+        super().__init__(f"limit zapytań do {time.strftime('%H:%M:%S', time.localtime(retry_at))}")
+        self.retry_at = retry_at
+
+
+MERGE_MAX_RETRIES = 5
+MERGE_BACKOFF_BASE_S = 0.2
+
+# liczniki: saves = wywołania save, conflicts = zapisy z >= 1 konfliktem,
+# retries = ponowienia po kolejnych konfliktach, failed = poddane po MERGE_MAX_RETRIES
+MERGE_STATS: dict[str, int] = {"saves": 0, "conflicts": 0, "retries": 0, "failed": 0, "compact_failed": 0}
+_merge_stats_lock = threading.Lock()
+
+
+def _count(key: str) -> None:
+    with _merge_stats_lock:
+        MERGE_STATS[key] += 1
+
+
+def merge_records(base: dict | None, ours: dict, theirs: dict | None) -> dict:
+    """
+    Scalanie trójstronne rekordów progresu (dowolnej wersji; wynik w schema_version 2):
+    - maski completed/favorites: bit ustawiony po którejkolwiek stronie zostaje, zdjęty po którejkolwiek znika
+    - reactions per dzień: jeśli my zmieniliśmy dzień względem base — nasza wartość (piszemy ostatni),
+      inaczej wartość z theirs
+    - start: zapisany wcześniej (theirs) wygrywa — harmonogram uid raz ustalony się nie przesuwa
+    Brak theirs (rekord usunięty w międzyczasie) -> zostaje nasz.
+    """
+    ours = upgrade_record(ours)
+    if theirs is None:
+        return ours
+    base, theirs = upgrade_record(base or {}), upgrade_record(theirs)
+    masks = []
+    for key in ("c", "f"):
+        b, o, t = base.get(key, 0), ours.get(key, 0), theirs.get(key, 0)
+        masks.append((o & t) | (o & ~b) | (t & ~b))
+
+    b_r, o_r, t_r = (record_reactions(x) for x in (base, ours, theirs))
+    reactions = {}
+    for day in set(o_r) | set(t_r):
+        value = o_r.get(day) if o_r.get(day) != b_r.get(day) else t_r.get(day)
+        if value:
+            reactions[day] = value
+    return make_record(ours.get("uid"), ours.get("updated_at"), *masks, *encode_reactions(reactions),
+                       campaign=ours.get("campaign") or theirs.get("campaign"),
+                       start=theirs.get("start") or ours.get("start"))
+
+
+def records_from_files(files: Iterable[tuple[str, bytes]], versions: bool = False) -> Iterator:
+    """
+    Rekordy z plików katalogu progress/ podanych jako (ścieżka względna od progress/, zawartość).
+    Obsługuje oba układy: progress/{uid}.json oraz shardy (snapshot + log); rekord z shardu
+    ma pierwszeństwo przed starym plikiem uid. Kolejność plików dowolna (np. tarball).
+    versions=True -> (uid, rekord, wersja jak w GitHubShardedStore.load) zamiast samego rekordu.
+    """
+    legacy: dict[str, dict] = {}
+    snapshots: dict[str, dict] = {}
+    logs: dict[str, list[dict]] = {}
+    for rel, raw in files:
+        text = raw.decode("utf-8")
+        if rel.startswith("shards/"):
+            name = rel[len("shards/"):]
+            if name.endswith(".log.ndjson"):
+                logs[name[: -len(".log.ndjson")]] = _parse_log(text)
+            elif name.endswith(".json"):
+                snapshots[name[: -len(".json")]] = json.loads(text or "{}")
+        elif "/" not in rel and rel.endswith(".json"):
+            obj = json.loads(text or "{}")
+            legacy[obj.get("uid") or rel[: -len(".json")]] = obj
+
+    sharded: dict[str, dict | None] = {}
+    for shard in set(snapshots) | set(logs):
+        sharded.update(snapshots.get(shard, {}))
+        for entry in logs.get(shard, []):
+            sharded[entry.get("uid")] = entry.get("rec")
+
+    for uid, obj in legacy.items():
+        if uid not in sharded:
+            yield (uid, obj, None) if versions else obj
+    for uid, obj in sharded.items():
+        if obj is not None:
+            yield (uid, obj, record_version(obj)) if versions else obj
+
+
+def iter_local_records(root: str) -> Iterator[dict]:
+    """Rekordy z lokalnej kopii repo (root zawiera progress/) albo z samego katalogu progress/."""
+    base = os.path.join(root, "progress") if os.path.isdir(os.path.join(root, "progress")) else root
+
+    def files():
+        for dirpath, _, names in os.walk(base):
+            for n in names:
+                full = os.path.join(dirpath, n)
+                with open(full, "rb") as f:
+                    yield os.path.relpath(full, base).replace(os.sep, "/"), f.read()
+
+    return records_from_files(files())
+
+
+# =========================
+# HTTP: wspólna sesja (keep-alive) + retry/backoff
+# =========================
+HTTP_TIMEOUT_S = 20
+HTTP_POOL_SIZE = 16
+HTTP_MAX_RETRIES = 3
+HTTP_BACKOFF_BASE_S = 0.5
+HTTP_MAX_WAIT_S = 30  # dłużej nie czekamy na reset limitu — wtedy błąd wraca do wywołującego
+# Poza http_background() (wątek skryptu Streamlit: load, load_progress) łączne czekanie między próbami
+# mieści się w tym limicie; limit do odczekania dłużej wraca od razu jako RateLimited.
+HTTP_INTERACTIVE_WAIT_S = 2.0
+SECONDARY_LIMIT_PAUSE_S = 60  # GitHub zaleca odczekać co najmniej minutę po "secondary rate limit"
+
+_http_lock = threading.Lock()
+_http_session: requests.Session | None = None
+
+# ostatnio widziany stan limitu GitHub API: limit / remaining / reset (epoch)
+RATE_LIMIT: dict[str, int] = {}
+
+
+def http_session() -> requests.Session:
+    """Jedna sesja na proces: pula połączeń do api.github.com bez ponownego handshake TLS."""
+    global _http_session
+    if _http_session is None:
+        with _http_lock:
+            if _http_session is None:
+                requests = lazy_import("requests")
+                s = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                _http_session = s
+    return _http_session
+
+
+def _retry_delay(r: requests.Response | None, attempt: int) -> float | None:
+    """Ile czekać przed kolejną próbą; None = nie ponawiać."""
+    backoff = HTTP_BACKOFF_BASE_S * (2 ** attempt) * (1 + random.random() / 2)
+    if r is None:
+        return backoff  # błąd połączenia/timeout
+
+    if r.status_code not in (403, 429) and r.status_code < 500:
+        return None
+
+    retry_after = r.headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    if r.headers.get("X-RateLimit-Remaining") == "0":
+        reset = r.headers.get("X-RateLimit-Reset", "")
+        if reset.isdigit():
+            return max(0.0, int(reset) - time.time()) + 1
+    if r.status_code == 403:
+        return None  # zwykły brak uprawnień
+    return backoff
+
+
+_http_local = threading.local()
+
+
+@contextmanager
+def http_background():
+    """Zapytania w tym bloku idą z wątku w tle (SaveWorker, CacheWarmer) — mogą czekać do HTTP_MAX_WAIT_S na próbę."""
+    prev = getattr(_http_local, "background", False)
+    _http_local.background = True
+    try:
+        yield
+    finally:
+        _http_local.background = prev
+
+
+def _note_rate_limit(r: requests.Response) -> None:
+    for key in ("Limit", "Remaining", "Reset"):
+        v = r.headers.get(f"X-RateLimit-{key}")
+        if v and v.isdigit():
+            RATE_LIMIT[key.lower()] = int(v)
+
+
+def raise_if_rate_limited(r: requests.Response) -> None:
+    """403/429 z powodu limitu (głównego albo "secondary") -> RateLimited; inne odpowiedzi bez zmian."""
+    if r.status_code not in (403, 429):
+        return
+    delay = _retry_delay(r, HTTP_MAX_RETRIES)
+    if delay is None and "rate limit" in r.text.lower():
+        delay = SECONDARY_LIMIT_PAUSE_S  # secondary limit bez Retry-After
+    if delay is not None:
+        raise RateLimited(time.time() + delay)
+
+
+def _may_wait(attempt: int, delay: float, waited: float, budget: float | None) -> bool:
+    if attempt >= HTTP_MAX_RETRIES or delay > HTTP_MAX_WAIT_S:
+        return False
+    return budget is None or waited + delay <= budget
+
+
+def http_request(method: str, url: str, **kw) -> requests.Response:
+    """
+    Zapytanie przez wspólną sesję z retry: błędy sieci, 5xx, 429 oraz 403 z wyczerpanym limitem.
+    Respektuje Retry-After i X-RateLimit-Reset (do HTTP_MAX_WAIT_S na próbę w http_background(),
+    inaczej do HTTP_INTERACTIVE_WAIT_S łącznie). Ostatnia odpowiedź jest zwracana bez raise_for_status —
+    o tym decyduje wywołujący.
+    """
+    kw.setdefault("timeout", HTTP_TIMEOUT_S)
+    requests = lazy_import("requests")
+    budget = None if getattr(_http_local, "background", False) else HTTP_INTERACTIVE_WAIT_S
+    waited = 0.0
+    attempt = 0
+    while True:
+        try:
+            # jeden span na próbę; status 0 = błąd połączenia/timeout
+            with span(f"http.{method}", status=0, attempt=attempt) as attrs:
+                r = http_session().request(method, url, **kw)
+                attrs["status"] = r.status_code
+        except (requests.ConnectionError, requests.Timeout):
+            delay = _retry_delay(None, attempt)
+            if not _may_wait(attempt, delay, waited, budget):
+                raise
+        else:
+            _note_rate_limit(r)
+            delay = _retry_delay(r, attempt)
+            if delay is None or not _may_wait(attempt, delay, waited, budget):
+                return r
+        time.sleep(delay)
+        waited += delay
+        attempt += 1
+
+
+# =========================
+# GitHub (Contents API)
+# =========================
+GITHUB_API_URL = "https://api.github.com"
+
+
+class GitHubContentsStore(ProgressStore):
+    name = "github"
+    rate_limited = True
+    ETAG_CACHE_SIZE = 2048  # tyle ostatnich plików trzymamy do zapytań warunkowych
+
+    def __init__(self, token: str, repo: str, branch: str = "main", api_url: str = GITHUB_API_URL):
+        self.token = token
+        self.repo = repo
+        self.branch = branch
+        self.api_url = api_url.rstrip("/")
+        self._headers = {
+            "Authorization": f"token {token}",
+            "Accept": "application/vnd.github+json",
+            "User-Agent": "seduceme-streamlit",
+        }
+        # path -> (etag, rekord, sha); GET z If-None-Match, 304 nie zużywa limitu API
+        self._etags: OrderedDict[str, tuple[str, dict, str | None]] = OrderedDict()
+        self._etags_lock = threading.Lock()
+
+    def _etag_get(self, path: str) -> tuple[str, dict, str | None] | None:
+        with self._etags_lock:
+            hit = self._etags.get(path)
+            if hit:
+                self._etags.move_to_end(path)
+            return hit
+
+    def _etag_put(self, path: str, etag: str, obj: dict, sha: str | None) -> None:
+        with self._etags_lock:
+            self._etags[path] = (etag, obj, sha)
+            self._etags.move_to_end(path)
+            while len(self._etags) > self.ETAG_CACHE_SIZE:
+                self._etags.popitem(last=False)
+
+    def _etag_drop(self, path: str) -> None:
+        with self._etags_lock:
+            self._etags.pop(path, None)
+
+    def _url(self, path: str) -> str:
+        return f"{self.api_url}/repos/{self.repo}/contents/{path}"
+
+    def get_file(self, path: str, parse) -> tuple[object | None, str | None]:
+        """
+        Pobiera plik i parsuje go funkcją parse(text). Zwraca (wartość, sha) albo (None, None) dla 404.
+        Sparsowana wartość jest trzymana z ETagiem — przy 304 nie ma pobierania ani parsowania.
+        """
+        with span("gh.get_file", path=path) as attrs:
+            headers = self._headers
+            cached = self._etag_get(path)
+            if cached:
+                headers = {**headers, "If-None-Match": cached[0]}
+
+            r = http_request("GET", self._url(path), headers=headers, params={"ref": self.branch})
+            attrs["status"] = r.status_code
+            if r.status_code == 304 and cached:
+                return copy.deepcopy(cached[1]), cached[2]
+            if r.status_code == 404:
+                self._etag_drop(path)
+                return None, None
+            raise_if_rate_limited(r)
+            r.raise_for_status()
+            with span("gh.decode", path=path):
+                data = r.json()
+                content_b64 = data.get("content", "")
+                raw = base64.b64decode(content_b64).decode("utf-8") if content_b64 else ""
+                value = parse(raw)
+        sha = data.get("sha")
+        etag = r.headers.get("ETag")
+        if etag:
+            self._etag_put(path, etag, copy.deepcopy(value), sha)
+        return value, sha
+
+    def put_file(self, path: str, raw: bytes, sha: str | None, message: str | None = None) -> requests.Response:
+        """Jeden PUT bez obsługi konfliktu; status sprawdza wywołujący."""
+        payload = {
+            "message": message or f"Update {path}",
+            "content": base64.b64encode(raw).decode("utf-8"),
+            "branch": self.branch,
+        }
+        if sha:
+            payload["sha"] = sha
+        with span("gh.put_file", path=path) as attrs:
+            r = http_request("PUT", self._url(path), headers=self._headers, json=payload)
+            attrs["status"] = r.status_code
+        # plik się zmienił (albo nie wiemy jak) -> stary ETag do niczego się nie przyda
+        self._etag_drop(path)
+        raise_if_rate_limited(r)
+        return r
+
+    def get_json(self, path: str) -> tuple[dict | None, str | None]:
+        return self.get_file(path, lambda raw: json.loads(raw or "{}"))
+
+    def delete_file(self, path: str, sha: str) -> None:
+        payload = {
+            "message": f"Delete {path}",
+            "sha": sha,
+            "branch": self.branch,
+        }
+        with span("gh.delete_file", path=path) as attrs:
+            r = http_request("DELETE", self._url(path), headers=self._headers, json=payload)
+            attrs["status"] = r.status_code
+        self._etag_drop(path)
+        raise_if_rate_limited(r)
+        if r.status_code == 404:
+            return
+        r.raise_for_status()
+
+    def load(self, uid: str) -> tuple[dict | None, str | None]:
+        return self.get_json(progress_path(uid))
+
+    def save_if(self, uid: str, obj: dict, version: str | None) -> str | None:
+        path = progress_path(uid)
+        r = self.put_file(path, dump_record(obj), version)
+        # 409 = nieaktualny sha, 422 = brak sha dla istniejącego pliku
+        if r.status_code in (409, 422):
+            raise VersionConflict(path)
+        r.raise_for_status()
+        # Contents API zwraca content.sha, więc nie trzeba dodatkowego GET
+        return (r.json().get("content") or {}).get("sha")
+
+    def delete(self, uid: str) -> None:
+        path = progress_path(uid)
+        _, sha = self.get_json(path)
+        if sha:
+            self.delete_file(path, sha)
+
+    def describe(self, uid: str) -> list[str]:
+        return [f"Repo storage: {self.repo} ({self.branch})", f"Plik: {progress_path(uid)}"]
+
+    def progress_files(self) -> Iterator[tuple[str, bytes]]:
+        """Całe progress/ jednym zapytaniem: tarball gałęzi czytany strumieniowo (ścieżki względne od progress/)."""
+        url = f"{self.api_url}/repos/{self.repo}/tarball/{self.branch}"
+        with span("gh.tarball") as attrs:
+            r = http_request("GET", url, headers=self._headers, stream=True, timeout=120)
+            attrs["status"] = r.status_code
+        raise_if_rate_limited(r)
+        r.raise_for_status()
+        r.raw.decode_content = True
+        with lazy_import("tarfile").open(fileobj=r.raw, mode="r|gz") as tar:
+            for m in tar:
+                # {owner}-{repo}-{sha}/progress/...
+                parts = m.name.split("/", 2)
+                if not m.isfile() or len(parts) < 3 or parts[1] != "progress":
+                    continue
+                yield parts[2], tar.extractfile(m).read()
+
+    def iter_records(self) -> Iterator[dict]:
+        return records_from_files(self.progress_files())
+
+    def iter_versions(self) -> Iterator[tuple[str, dict, str | None]]:
+        # sha z Contents API to sha obiektu blob w git — liczymy je z treści pliku z tarballa
+        for rel, raw in self.progress_files():
+            if "/" not in rel and rel.endswith(".json"):
+                yield rel[: -len(".json")], json.loads(raw or b"{}"), git_blob_sha(raw)
+
+
+# =========================
+# GitHub: układ shardowany (snapshot + log zmian)
+# =========================
+SHARD_PREFIX_LEN = 2  # 2 znaki hex -> max 256 shardów niezależnie od liczby użytkowników
+LOG_COMPACT_AT = 64  # po tylu wpisach log jest wkładany do snapshotu i czyszczony
+SHARD_MAX_RETRIES = 5
+
+
+def shard_of(uid: str) -> str:
+    return hashlib.sha256(uid.encode("utf-8")).hexdigest()[:SHARD_PREFIX_LEN]
+
+
+def shard_snapshot_path(shard: str) -> str:
+    return f"progress/shards/{shard}.json"
+
+
+def shard_log_path(shard: str) -> str:
+    return f"progress/shards/{shard}.log.ndjson"
+
+
+def git_blob_sha(raw: bytes) -> str:
+    return hashlib.sha1(b"blob %d\0" % len(raw) + raw).hexdigest()
+
+
+def _parse_log(raw: str) -> list[dict]:
+    return [json.loads(line) for line in raw.splitlines() if line.strip()]
+
+
+def record_version(rec: dict) -> str:
+    """Wersja rekordu w shardzie: skrót kanonicznego JSON-a."""
+    raw = json.dumps(rec, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()
+
+
+def _dump_log(entries: list[dict]) -> bytes:
+    return "".join(json.dumps(e, ensure_ascii=False, separators=(",", ":")) + "\n" for e in entries).encode("utf-8")
+
+
+class GitHubShardedStore(GitHubContentsStore):
+    """
+    Użytkownicy pogrupowani w shardy wg prefiksu sha256(uid):
+    - progress/shards/{ab}.json        — snapshot {uid: rekord}
+    - progress/shards/{ab}.log.ndjson  — dopisywany log {"uid", "rec"} (rec = None -> usunięcie)
+    Odczyt = snapshot + odtworzenie logu (ostatni wpis wygrywa). Co LOG_COMPACT_AT wpisów log jest
+    kompaktowany do snapshotu. Drzewo repo ma stały rozmiar (2 pliki na shard), a odczyt wszystkich
+    użytkowników to 2 * liczba shardów zapytań zamiast jednego na uid.
+    Wersją rekordu jest skrót jego treści (record_version), niezależny od zapisów innych uid w shardzie.
+    Brakujący uid jest jeszcze szukany w starym pliku progress/{uid}.json (migracja przy pierwszym zapisie;
+    wersja None, bo w shardzie go jeszcze nie ma).
+    """
+
+    name = "github-sharded"
+
+    def __init__(self, token: str, repo: str, branch: str = "main", api_url: str = GITHUB_API_URL):
+        super().__init__(token, repo, branch, api_url)
+        self._shard_locks: dict[str, threading.Lock] = {}
+        self._shard_locks_guard = threading.Lock()
+
+    def _shard_lock(self, shard: str) -> threading.Lock:
+        with self._shard_locks_guard:
+            return self._shard_locks.setdefault(shard, threading.Lock())
+
+    def _read_shard(self, shard: str) -> tuple[dict, list[dict], str | None]:
+        snapshot, _ = self.get_file(shard_snapshot_path(shard), lambda raw: json.loads(raw or "{}"))
+        log, log_sha = self.get_file(shard_log_path(shard), _parse_log)
+        return snapshot or {}, log or [], log_sha
+
+    @staticmethod
+    def _replay(snapshot: dict, log: list[dict]) -> dict:
+        records = dict(snapshot)
+        for entry in log:
+            if entry.get("rec") is None:
+                records.pop(entry.get("uid"), None)
+            else:
+                records[entry.get("uid")] = entry["rec"]
+        return records
+
+    def _current(self, uid: str, log: list[dict]) -> dict | None:
+        snapshot, _ = self.get_file(shard_snapshot_path(shard_of(uid)), lambda raw: json.loads(raw or "{}"))
+        return self._replay({uid: (snapshot or {}).get(uid)}, [e for e in log if e.get("uid") == uid]).get(uid)
+
+    def load(self, uid: str) -> tuple[dict | None, str | None]:
+        log, _ = self.get_file(shard_log_path(shard_of(uid)), _parse_log)
+        log = log or []
+        rec = self._current(uid, log)
+        if rec is None and not any(e.get("uid") == uid for e in log):
+            rec, _ = self.get_json(progress_path(uid))
+            return rec, None
+        if rec is None:
+            return None, None  # ostatni wpis logu to usunięcie (reset) — jak brak rekordu
+        return rec, record_version(rec)
+
+    def _append(self, uid: str, rec: dict | None, expect=...) -> str | None:
+        """
+        Dopisuje wpis do logu shardu; przy konflikcie sha logu (zapis innego uid) pobiera log ponownie
+        i dopisuje jeszcze raz. expect = oczekiwana wersja rekordu uid (pominięte = bez sprawdzania).
+        """
+        shard = shard_of(uid)
+        path = shard_log_path(shard)
+        with self._shard_lock(shard):
+            for attempt in range(SHARD_MAX_RETRIES):
+                log, sha = self.get_file(path, _parse_log)
+                log = log or []
+                if expect is not ...:
+                    current = self._current(uid, log)
+                    if (record_version(current) if current is not None else None) != expect:
+                        raise VersionConflict(uid)
+                log = log + [{"uid": uid, "rec": rec}]
+                r = self.put_file(path, _dump_log(log), sha, message=f"Update {path} ({uid})")
+                if r.status_code in (409, 422):
+                    time.sleep(HTTP_BACKOFF_BASE_S * (2 ** attempt) * random.random())
+                    continue
+                r.raise_for_status()
+                if len(log) >= LOG_COMPACT_AT:
+                    # wpis już zapisany — błąd kompaktowania (409 z innej repliki, 5xx, limit) nie może wrócić
+                    # jako błąd zapisu (ponowienie dopisałoby duplikat); log skompaktuje następny zapis shardu
+                    try:
+                        self._compact(shard)
+                    except Exception:
+                        _count("compact_failed")
+                return record_version(rec) if rec is not None else None
+        raise RuntimeError(f"Nie udało się zapisać {path}: konflikt sha po {SHARD_MAX_RETRIES} próbach")
+
+    def _compact(self, shard: str) -> None:
+        """
+        Wkłada log do snapshotu i czyści log. Wywoływane pod blokadą shardu.
+        Kolejność (najpierw snapshot, potem log) jest bezpieczna: wpisy logu to pełne rekordy,
+        więc ponowne odtworzenie tego samego logu na nowym snapshocie nic nie zmienia.
+        """
+        snapshot, log, log_sha = self._read_shard(shard)
+        if not log:
+            return
+        snap_path = shard_snapshot_path(shard)
+        _, snap_sha = self.get_file(snap_path, lambda raw: json.loads(raw or "{}"))
+        merged = self._replay(snapshot, log)
+        raw = json.dumps(merged, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+        self.put_file(snap_path, raw, snap_sha, message=f"Compact {snap_path}").raise_for_status()
+
+        r = self.put_file(shard_log_path(shard), b"\n", log_sha, message=f"Compact {shard_log_path(shard)}")
+        if r.status_code in (409, 422):
+            return  # ktoś dopisał w międzyczasie — log zostanie skompaktowany następnym razem
+        r.raise_for_status()
+
+    def save_if(self, uid: str, obj: dict, version: str | None) -> str | None:
+        return self._append(uid, obj, expect=version)
+
+    def delete(self, uid: str) -> None:
+        self._append(uid, None)
+        _, sha = self.get_json(progress_path(uid))
+        if sha:
+            self.delete_file(progress_path(uid), sha)
+
+    def describe(self, uid: str) -> list[str]:
+        shard = shard_of(uid)
+        return [
+            f"Repo storage: {self.repo} ({self.branch}), shardy",
+            f"Plik: {shard_snapshot_path(shard)} + {shard_log_path(shard)}",
+        ]
+
+    def iter_versions(self) -> Iterator[tuple[str, dict, str | None]]:
+        return records_from_files(self.progress_files(), versions=True)
+
+
+# =========================
+# SQLite (lokalnie, WAL)
+# =========================
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS progress (
+    uid TEXT PRIMARY KEY,
+    rev INTEGER NOT NULL,
+    updated_at TEXT NOT NULL,
+    completed_count INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS progress_updated_at ON progress(updated_at);
+CREATE INDEX IF NOT EXISTS progress_completed_count ON progress(completed_count);
+"""
+
+
+class SQLiteStore(ProgressStore):
+    """
+    Jeden wiersz na uid. Połączenie per wątek (Streamlit obsługuje sesje w wielu wątkach),
+    WAL pozwala czytać równolegle z zapisem. Wersja = kolumna rev (licznik zapisów).
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(_SQLITE_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # autocommit; transakcje otwieramy jawnie (BEGIN IMMEDIATE w save_if)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, uid: str) -> tuple[dict | None, str | None]:
+        row = self._conn().execute("SELECT data, rev FROM progress WHERE uid = ?", (uid,)).fetchone()
+        if row is None:
+            return None, None
+        return json.loads(row[0]), str(row[1])
+
+    def save_if(self, uid: str, obj: dict, version: str | None) -> str | None:
+        data = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT rev FROM progress WHERE uid = ?", (uid,)).fetchone()
+            current = str(row[0]) if row else None
+            if current != version:
+                raise VersionConflict(uid)
+            rev = (row[0] if row else 0) + 1
+            conn.execute(
+                """
+                INSERT INTO progress (uid, rev, updated_at, completed_count, data)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(uid) DO UPDATE SET
+                    rev = excluded.rev,
+                    updated_at = excluded.updated_at,
+                    completed_count = excluded.completed_count,
+                    data = excluded.data
+                """,
+                (uid, rev, obj.get("updated_at", ""), upgrade_record(obj)["c"].bit_count(), data),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return str(rev)
+
+    def delete(self, uid: str) -> None:
+        with self._conn() as conn:
+            conn.execute("DELETE FROM progress WHERE uid = ?", (uid,))
+
+    def describe(self, uid: str) -> list[str]:
+        return [f"SQLite storage: {self.path}", f"uid: {uid}"]
+
+    def iter_records(self) -> Iterator[dict]:
+        for (data,) in self._conn().execute("SELECT data FROM progress ORDER BY uid"):
+            yield json.loads(data)
+
+    def iter_versions(self) -> Iterator[tuple[str, dict, str | None]]:
+        for uid, data, rev in self._conn().execute("SELECT uid, data, rev FROM progress"):
+            yield uid, json.loads(data), str(rev)
+
+
+# =========================
+# Wspólny cache odczytów (wszystkie sesje w procesie)
+# =========================
+RECORD_CACHE_SIZE = 4096
+RECORD_CACHE_TTL_S = 30.0
+
+
+class _Flight:
+    """Trwające wczytanie klucza; pozostali czekający dostają ten sam wynik."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value: tuple[dict | None, str | None] | None = None
+        self.error: BaseException | None = None
+        self.stale = False  # w trakcie wczytywania był lokalny zapis -> wyniku nie zapisujemy w cache
+
+
+class RecordCache:
+    """
+    LRU uid -> (rekord, wersja) z limitem rozmiaru i TTL, bezpieczny wątkowo.
+    Równoczesne chybienia na tym samym kluczu są sklejane (single-flight): do storage idzie jedno zapytanie.
+    Zwracane rekordy są kopiami.
+    """
+
+    def __init__(self, max_size: int = RECORD_CACHE_SIZE, ttl_s: float = RECORD_CACHE_TTL_S):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        # uid -> (monotonic wygaśnięcia, rekord, wersja)
+        self._data: OrderedDict[str, tuple[float, dict | None, str | None]] = OrderedDict()
+        self._inflight: dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "warmed": 0}
+
+    def _put_locked(self, key: str, value: tuple[dict | None, str | None], ttl_s: float | None = None) -> None:
+        expires = time.monotonic() + (self.ttl_s if ttl_s is None else ttl_s)
+        self._data[key] = (expires, copy.deepcopy(value[0]), value[1])
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def get_or_load(self, key: str, loader) -> tuple[dict | None, str | None]:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit and time.monotonic() < hit[0]:
+                self._data.move_to_end(key)
+                self.stats["hits"] += 1
+                return copy.deepcopy(hit[1]), hit[2]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                self.stats["misses"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.value[0]), flight.value[1]
+
+        try:
+            flight.value = loader()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+                if flight.error is None and not flight.stale:
+                    self._put_locked(key, flight.value)
+            flight.event.set()
+        return copy.deepcopy(flight.value[0]), flight.value[1]
+
+    def put(self, key: str, value: tuple[dict | None, str | None]) -> None:
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is not None:
+                flight.stale = True
+            self._put_locked(key, value)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is not None:
+                flight.stale = True
+            self._data.pop(key, None)
+
+    def warm(self, items: Iterable[tuple[str, dict, str | None]], ttl_s: float) -> int:
+        """
+        Wkłada (uid, rekord, wersja) z masowego odczytu z własnym TTL. Pomija uid ze świeżym wpisem
+        albo trwającym wczytaniem — lokalny zapis/odczyt jest nowszy niż migawka. Zwraca liczbę wpisów.
+        """
+        n = 0
+        with self._lock:
+            now = time.monotonic()
+            for key, rec, version in items:
+                hit = self._data.get(key)
+                if key in self._inflight or (hit and now < hit[0]):
+                    continue
+                self._data[key] = (now + ttl_s, rec, version)
+                self._data.move_to_end(key)
+                n += 1
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+            self.stats["warmed"] += n
+        return n
+
+
+class CachedStore(ProgressStore):
+    """Dowolny backend z RecordCache przed odczytami; lokalne zapisy aktualizują/unieważniają cache."""
+
+    def __init__(self, inner: ProgressStore, cache: RecordCache):
+        self.inner = inner
+        self.cache = cache
+        self.name = inner.name
+        self.rate_limited = inner.rate_limited
+
+    def load(self, uid: str) -> tuple[dict | None, str | None]:
+        return self.cache.get_or_load(uid, lambda: self.inner.load(uid))
+
+    def save_if(self, uid: str, obj: dict, version: str | None) -> str | None:
+        try:
+            new_version = self.inner.save_if(uid, obj, version)
+        except Exception:
+            self.cache.invalidate(uid)
+            raise
+        self.cache.put(uid, (obj, new_version))
+        return new_version
+
+    def save(self, uid: str, obj: dict, version: str | None, base: dict | None = None) -> tuple[str | None, dict]:
+        # scalanie przy konflikcie czyta bezpośrednio z backendu, nie z cache
+        try:
+            new_version, saved = self.inner.save(uid, obj, version, base)
+        except Exception:
+            self.cache.invalidate(uid)
+            raise
+        self.cache.put(uid, (saved, new_version))
+        return new_version, saved
+
+    def delete(self, uid: str) -> None:
+        try:
+            self.inner.delete(uid)
+        finally:
+            self.cache.invalidate(uid)
+
+    def describe(self, uid: str) -> list[str]:
+        return self.inner.describe(uid)
+
+    def iter_records(self) -> Iterator[dict]:
+        return self.inner.iter_records()
+
+    def iter_versions(self) -> Iterator[tuple[str, dict, str | None]]:
+        return self.inner.iter_versions()
+
+
+# =========================
+# Rozgrzewanie cache przed granicą odblokowania
+# =========================
+# O północy (odblokowanie nowego dnia w kampaniach "global") wracający użytkownicy otwierają aplikację naraz
+# i każdy chybia w RecordCache. CacheWarmer kilka minut wcześniej wczytuje jednym masowym odczytem
+# (tarball progress/ na GitHub, jedno SELECT w SQLite) rekordy ostatnio aktywnych uid z TTL obejmującym szczyt.
+WARMUP_LEAD_S = 300.0  # tyle przed granicą startuje rozgrzewka
+WARMUP_TTL_S = 1200.0  # rozgrzane wpisy żyją przez granicę i kwadrans po niej
+WARMUP_ACTIVE_S = 14 * 86400  # "ostatnio aktywny" = zapis w tym oknie
+
+
+class CacheWarmer:
+    """
+    Wątek w tle: next_boundary() zwraca epoch kolejnej granicy odblokowania (None = brak w perspektywie),
+    warmer budzi się WARMUP_LEAD_S przed nią i raz na granicę wypełnia cache CachedStore.
+    Rozgrzewamy najwyżej cache.max_size najświeższych uid; błąd (np. RateLimited) tylko kończy tę rozgrzewkę.
+    """
+
+    def __init__(self, store: CachedStore, next_boundary, lead_s: float = WARMUP_LEAD_S,
+                 ttl_s: float = WARMUP_TTL_S, active_s: float = WARMUP_ACTIVE_S):
+        self.store = store
+        self.next_boundary = next_boundary
+        self.lead_s = lead_s
+        self.ttl_s = ttl_s
+        self.active_s = active_s
+        self.stats: dict[str, object] = {"runs": 0, "warmed": 0, "errors": 0, "last": None}
+        threading.Thread(target=self._loop, name="cache-warmup", daemon=True).start()
+
+    def warm(self) -> int:
+        since = time.time() - self.active_s
+        with span("cache.warm") as attrs:
+            recent = []
+            for uid, rec, version in self.store.iter_versions():
+                try:
+                    ts = datetime.fromisoformat(rec.get("updated_at") or "").timestamp()
+                except (TypeError, ValueError):
+                    continue
+                if ts >= since:
+                    recent.append((ts, uid, rec, version))
+            # najświeższe na koniec — w LRU zostają najdłużej
+            recent.sort(key=lambda x: x[0])
+            n = self.store.cache.warm(((uid, rec, v) for _, uid, rec, v in recent[-self.store.cache.max_size:]),
+                                      self.ttl_s)
+            attrs.update(records=len(recent), warmed=n)
+        self.stats.update(runs=self.stats["runs"] + 1, warmed=n, last=time.time())
+        return n
+
+    def _loop(self) -> None:
+        done_for = None
+        while True:
+            boundary = self.next_boundary()
+            if boundary is None:
+                time.sleep(3600)
+                continue
+            wait = boundary - self.lead_s - time.time()
+            if wait > 0:
+                time.sleep(min(wait, 3600))  # granica mogła się zmienić (nowa kampania) — sprawdzamy co godzinę
+                continue
+            if done_for != boundary:
+                done_for = boundary
+                try:
+                    with http_background():
+                        self.warm()
+                except Exception:
+                    self.stats["errors"] += 1
+            time.sleep(max(1.0, boundary - time.time() + 1))
+
+
+# =========================
+# Zapis w tle
+# =========================
+# Limity GitHub: 5000 zapytań/h na token (nagłówki X-RateLimit-*) oraz "secondary" limit na tworzenie
+# treści (zalecane <= 80 zapisów/min). Części RATE_LIMIT_RESERVE limitu nie ruszamy zapisami — zostaje na odczyty.
+WRITES_PER_MIN = 60
+WRITE_BURST = 10
+RATE_LIMIT_RESERVE = 0.04  # 200 z 5000
+WRITE_MAX_WAIT_S = 2.0  # dłużej zapis nie czeka w kolejce — jest odkładany do resetu limitu
+
+
+class WriteLimiter:
+    """
+    Dopuszczanie zapisów: token bucket (WRITES_PER_MIN, zryw WRITE_BURST) + pozostały limit z RATE_LIMIT
+    + pauza po odrzuceniu przez backend (RateLimited). reserve() zwraca 0 i zużywa token albo ile czekać.
+    """
+
+    def __init__(self, writes_per_min: float = WRITES_PER_MIN, burst: int = WRITE_BURST,
+                 reserve: float = RATE_LIMIT_RESERVE):
+        self.rate = writes_per_min / 60.0
+        self.burst = burst
+        self.reserve_quota = reserve
+        self._tokens = float(burst)
+        self._stamp = time.monotonic()
+        self._paused_until = 0.0  # epoch
+        self._lock = threading.Lock()
+
+    def pause(self, until: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, until)
+
+    def reserve(self) -> float:
+        now = time.time()
+        with self._lock:
+            if self._paused_until > now:
+                return self._paused_until - now
+            remaining, reset = RATE_LIMIT.get("remaining"), RATE_LIMIT.get("reset", 0)
+            floor = RATE_LIMIT.get("limit", 0) * self.reserve_quota
+            if remaining is not None and remaining <= floor and reset > now:
+                return reset - now
+            if self.rate <= 0:
+                return 0.0
+            mono = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (mono - self._stamp) * self.rate)
+            self._stamp = mono
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+
+JOURNAL_PATH = ".progress-journal.ndjson"
+JOURNAL_FSYNC_INTERVAL_S = 0.01  # okno grupowania fsync: kliknięcia z tego okna dzielą jeden fsync
+JOURNAL_COMPACT_BYTES = 1 << 20
+JOURNAL_REPLAY_AFTER_S = 30.0  # wpis bez potwierdzenia starszy niż to = sesja nie zdążyła go wysłać
+JOURNAL_REPLAY_INTERVAL_S = 10.0
+
+
+class Journal:
+    """
+    Lokalny dziennik zapisów (write-ahead, NDJSON, tylko dopisywanie) — przed wysłaniem do backendu.
+    Linia {"seq", "uid", "origin", "ts", "rec", "version", "base"} = pełny stan uid po zmianie w źródle origin
+    (sesja); linia {"ack", "uid", "origin"} = backend zapisał stan tego źródła co najmniej z wpisu seq.
+    Niepotwierdzony jest ostatni wpis każdej pary (uid, źródło) — dwie karty/urządzenia jednego uid
+    nie wypierają nawzajem swoich zmian.
+    fsync jest grupowany w tle (JOURNAL_FSYNC_INTERVAL_S); wait_durable czeka na fsync danego wpisu.
+    Plik jest przepisywany (same niepotwierdzone wpisy) po przekroczeniu JOURNAL_COMPACT_BYTES i przy starcie.
+    Jeden plik = jeden proces (Streamlit obsługuje wszystkie sesje w jednym procesie).
+    """
+
+    def __init__(self, path: str, fsync_interval_s: float = JOURNAL_FSYNC_INTERVAL_S):
+        self.path = path
+        self.fsync_interval_s = fsync_interval_s
+        self._cond = threading.Condition()
+        self._pending: dict[tuple[str, str | None], dict] = {}  # (uid, źródło) -> ostatni niepotwierdzony wpis
+        self._seq = 0
+        self._written = 0  # ostatni seq zapisany do pliku (bufor OS)
+        self._durable = 0  # ostatni seq po fsync
+        self._load()
+        self._compact()
+        threading.Thread(target=self._fsync_loop, name="progress-journal-fsync", daemon=True).start()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # urwana ostatnia linia po awarii
+                key = (entry.get("uid"), entry.get("origin"))  # starsze pliki: bez "origin"
+                if "ack" in entry:
+                    cur = self._pending.get(key)
+                    if cur is not None and cur["seq"] <= entry["ack"]:
+                        del self._pending[key]
+                elif "seq" in entry:
+                    self._pending[key] = entry
+                    self._seq = max(self._seq, entry["seq"])
+
+    def _write_locked(self, entry: dict) -> None:
+        self._file.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+        self._file.flush()
+
+    def _compact(self) -> None:
+        """Przepisuje plik: same niepotwierdzone wpisy (atomowo: plik tymczasowy + rename)."""
+        with self._cond:
+            if getattr(self, "_file", None) is not None:
+                self._file.close()
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as f:
+                for entry in sorted(self._pending.values(), key=lambda e: e["seq"]):
+                    f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self._file = open(self.path, "ab")
+            self._written = self._durable = self._seq
+
+    def append(self, uid: str, rec: dict, version: str | None, base: dict | None, origin: str | None = None) -> int:
+        with self._cond:
+            self._seq += 1
+            entry = {"seq": self._seq, "uid": uid, "origin": origin, "ts": time.time(),
+                     "rec": rec, "version": version, "base": base}
+            self._write_locked(entry)
+            self._pending[(uid, origin)] = entry
+            self._written = self._seq
+            self._cond.notify_all()
+            return self._seq
+
+    def wait_durable(self, seq: int, timeout: float = 1.0) -> bool:
+        """Czeka, aż wpis seq będzie na dysku (fsync). False = nie zdążył w timeout."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._durable < seq:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                self._cond.wait(left)
+            return True
+
+    def ack(self, uid: str, seq: int, origin: str | None = None) -> None:
+        """Backend zapisał stan uid ze źródła origin z wpisu seq (albo nowszy)."""
+        with self._cond:
+            cur = self._pending.get((uid, origin))
+            if cur is None or cur["seq"] > seq:
+                return
+            del self._pending[(uid, origin)]
+            self._write_locked({"ack": seq, "uid": uid, "origin": origin})
+            too_big = self._file.tell() > JOURNAL_COMPACT_BYTES
+        if too_big:
+            self._compact()
+
+    def forget(self, uid: str) -> None:
+        """Reset uid: niepotwierdzone wpisy (wszystkich źródeł) nie będą już wysyłane."""
+        with self._cond:
+            entries = [e for (u, _), e in self._pending.items() if u == uid]
+        for e in entries:
+            self.ack(uid, e["seq"], e.get("origin"))
+
+    def pending(self) -> list[dict]:
+        with self._cond:
+            return sorted(self._pending.values(), key=lambda e: e["seq"])
+
+    def _fsync_loop(self) -> None:
+        while True:
+            with self._cond:
+                while self._durable >= self._written:
+                    self._cond.wait()
+            time.sleep(self.fsync_interval_s)  # zbieramy kolejne dopiski do tego samego fsync
+            with self._cond:
+                target = self._written
+                f = self._file
+            try:
+                os.fsync(f.fileno())
+            except (ValueError, OSError):
+                pass  # plik zamknięty przez _compact — nowy plik jest już po fsync
+            with self._cond:
+                self._durable = max(self._durable, target)
+                self._cond.notify_all()
+
+
+class SaveWorker:
+    """
+    Planista zapisów w tle, żeby wątek skryptu Streamlit nie czekał na storage.
+    - kolejność per uid: dla uid naraz trwa co najwyżej jeden zapis, a czekający jest zastępowany nowszym
+      z tego samego źródła (origin = sesja; rekord to pełny stan, więc wystarczy ostatni); czekający zapis
+      innego źródła (druga karta/urządzenie, powtórka z dziennika) jest z nowszym scalany (merge_records),
+      żeby żadna zmiana nie przepadła; kolejny zapis tej samej sesji, wysłany zanim odebrała wynik
+      poprzedniego (ta sama wersja wyjściowa), dostaje wersję i bazę scalania zwrócone przez poprzedni,
+      więc nie wpada w konflikt z samym sobą; zapis każdego innego źródła idzie ze swoją wersją
+      — nieaktualna kończy się VersionConflict i scaleniem w ProgressStore.save
+    - sprawiedliwość: uid czekają w jednej kolejce FIFO, po zapisie uid wraca na jej koniec
+    - dopuszczanie (tylko backendy z rate_limited): WriteLimiter; gdy trzeba by czekać dłużej niż
+      WRITE_MAX_WAIT_S albo backend zwrócił RateLimited — zapis jest odkładany do resetu limitu
+    - trwałość: z Journal zapis potwierdza wpis dziennika (seq); niepotwierdzone wpisy są wysyłane
+      przy starcie i w tle (gdy sesja nie zdążyła ich wysłać) — dziennik trzyma też odłożone zapisy
+    Każde submit zwraca numer biletu; result(uid, bilet, źródło) mówi, czy zapis tego źródła co najmniej
+    tak nowy już się zakończył (wynik scalonego zapisu dostaje każde scalone źródło z własnym biletem),
+    a is_deferred(uid) — czy zapis uid czeka na limit.
+    """
+
+    def __init__(self, store: ProgressStore, max_workers: int = 4, limiter: WriteLimiter | None = None,
+                 journal: Journal | None = None):
+        self.store = store
+        self.limiter = limiter if limiter is not None else (WriteLimiter() if store.rate_limited else None)
+        self.journal = journal
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="progress-save")
+        self._cond = threading.Condition()
+        self._tickets = itertools.count(1)
+        self._ready: deque[str] = deque()  # uid gotowe do zapisu, FIFO
+        self._running: set[str] = set()
+        # uid -> (bilet, rekord, wersja, baza, {źródło: (bilet, seq wpisu dziennika albo None)}, źródło albo None)
+        self._waiting: dict[str, tuple[int, dict, str | None, dict | None, dict, str | None]] = {}
+        self._deferred_until: dict[str, float] = {}  # uid -> epoch; zapis czeka na limit
+        # uid -> (źródło, wersja wysłana przez źródło, nowa wersja, zapisany rekord) ostatniego zapisu
+        self._versions: dict[str, tuple[str | None, str | None, str | None, dict]] = {}
+        # (uid, źródło) -> (bilet, wersja, błąd, zapisany rekord)
+        self._done: dict[tuple[str, str | None], tuple[int, str | None, str | None, dict | None]] = {}
+
+        threading.Thread(target=self._dispatch, name="progress-save-dispatch", daemon=True).start()
+        if journal is not None:
+            self.replay(max_age_s=0)  # zaległe zapisy sprzed restartu
+            threading.Thread(target=self._replay_loop, name="progress-journal-replay", daemon=True).start()
+
+    @staticmethod
+    def _fold(older: tuple, newer: tuple) -> tuple:
+        """
+        Dwa czekające zapisy uid -> jeden. To samo źródło: nowszy to pełny stan, starszy odpada.
+        Różne (albo nieznane) źródła: nowszy scalony ze starszym względem bazy starszego —
+        zmiany obu zostają; źródło wyniku nieznane (None), bo to już nie jest stan żadnej sesji.
+        Źródła (bilet do wyniku, wpis dziennika do potwierdzenia) są sumą obu — per źródło nowszy.
+        """
+        ticket, obj, version, base, newer_sources, origin = newer
+        sources = dict(older[4])
+        for o, (t, q) in newer_sources.items():
+            sources[o] = (t, q if q is not None else sources.get(o, (t, None))[1])
+        if origin is not None and origin == older[5]:
+            return ticket, obj, version, base, sources, origin
+        return ticket, merge_records(older[3], obj, older[1]), version, base, sources, None
+
+    def submit(self, uid: str, obj: dict, version: str | None, base: dict | None = None,
+               seq: int | None = None, origin: str | None = None) -> int:
+        """origin — identyfikator źródła (sesji); zapisy z tego samego źródła zastępują się nawzajem."""
+        with self._cond:
+            ticket = next(self._tickets)
+            job = (ticket, obj, version, base, {origin: (ticket, seq)}, origin)
+            waiting = self._waiting.get(uid)
+            self._waiting[uid] = job if waiting is None else self._fold(waiting, job)
+            if uid not in self._deferred_until and uid not in self._running and uid not in self._ready:
+                self._ready.append(uid)
+                self._cond.notify()
+        return ticket
+
+    def busy(self, uid: str) -> bool:
+        with self._cond:
+            return uid in self._waiting or uid in self._running or uid in self._deferred_until
+
+    def is_deferred(self, uid: str) -> bool:
+        with self._cond:
+            return uid in self._deferred_until
+
+    def replay(self, max_age_s: float = JOURNAL_REPLAY_AFTER_S) -> int:
+        """Wysyła niepotwierdzone wpisy dziennika starsze niż max_age_s (dla uid bez zapisu w toku)."""
+        if self.journal is None:
+            return 0
+        n = 0
+        now = time.time()
+        entries = self.journal.pending()
+        busy = {e["uid"] for e in entries if self.busy(e["uid"])}  # przed wysłaniem: kilka źródeł jednego uid
+        for e in entries:
+            if now - e["ts"] >= max_age_s and e["uid"] not in busy:
+                self.submit(e["uid"], e["rec"], e["version"], e["base"], seq=e["seq"], origin=e.get("origin"))
+                n += 1
+        return n
+
+    def _replay_loop(self) -> None:
+        while True:
+            time.sleep(JOURNAL_REPLAY_INTERVAL_S)
+            self.replay()
+
+    def _dispatch(self) -> None:
+        while True:
+            with self._cond:
+                now = time.time()
+                for uid, until in list(self._deferred_until.items()):
+                    if until <= now:
+                        del self._deferred_until[uid]
+                        if uid in self._waiting and uid not in self._running and uid not in self._ready:
+                            self._ready.append(uid)
+                if not self._ready:
+                    timeout = min(self._deferred_until.values(), default=now + 60) - now
+                    self._cond.wait(timeout=max(0.05, timeout))
+                    continue
+                uid = self._ready.popleft()
+
+            wait = self.limiter.reserve() if self.limiter is not None else 0.0
+            if wait > WRITE_MAX_WAIT_S:
+                with self._cond:
+                    self._deferred_until[uid] = time.time() + wait
+                continue
+            if wait > 0:
+                time.sleep(wait)
+                with self._cond:
+                    self._ready.appendleft(uid)
+                continue
+            with self._cond:
+                self._running.add(uid)
+            self._pool.submit(self._run, uid)
+
+    def _run(self, uid: str) -> None:
+        with self._cond:
+            job = self._waiting.pop(uid, None)
+            if job is None:
+                self._running.discard(uid)
+                return
+            ticket, obj, version, base, sources, origin = job
+            prev = self._versions.get(uid)
+        submitted_version = version
+        if prev is not None and origin is not None and prev[0] == origin and prev[1] == version:
+            version, base = prev[2], prev[3]  # ta sama sesja, jeszcze bez wyniku poprzedniego zapisu
+        try:
+            with http_background(), span("save_progress", backend=self.store.name):
+                (new_version, saved), error = self.store.save(uid, obj, version, base), None
+        except RateLimited as e:
+            if self.limiter is not None:
+                self.limiter.pause(e.retry_at)
+            with self._cond:
+                waiting = self._waiting.get(uid)  # nowszy zapis (jeśli przyszedł) wchłania odłożony
+                self._waiting[uid] = job if waiting is None else self._fold(job, waiting)
+                self._running.discard(uid)
+                self._deferred_until[uid] = e.retry_at
+            return
+        except Exception as e:
+            new_version, saved, error = None, None, str(e)
+        if error is None and self.journal is not None:
+            for source, (_, seq) in sources.items():
+                if seq is not None:
+                    self.journal.ack(uid, seq, source)
+        with self._cond:
+            if error is None:
+                self._versions[uid] = (origin, submitted_version, new_version, saved)
+            for source, (source_ticket, _) in sources.items():
+                self._done[(uid, source)] = (source_ticket, new_version, error, saved)
+            self._running.discard(uid)
+            if uid in self._waiting:
+                self._ready.append(uid)  # nowszy zapis w trakcie — na koniec kolejki
+                self._cond.notify()
+
+    def result(self, uid: str, ticket: int, origin: str | None = None) -> tuple[str | None, str | None, dict | None] | None:
+        """
+        None = jeszcze trwa (albo czeka na limit); inaczej (wersja, błąd, zapisany rekord) ostatniego zapisu uid
+        ze źródła origin — wynik (także błąd) zapisu innej sesji tego uid nie jest wynikiem tej.
+        """
+        with self._cond:
+            done = self._done.get((uid, origin))
+        if done is None or done[0] < ticket:
+            return None
+        return done[1], done[2], done[3]
+
+    def forget(self, uid: str) -> None:
+        """Po resecie uid: zapomnij ostatnią wersję, czekające zapisy i wpis dziennika."""
+        with self._cond:
+            self._versions.pop(uid, None)
+            for key in [k for k in self._done if k[0] == uid]:
+                del self._done[key]
+            self._waiting.pop(uid, None)
+            self._deferred_until.pop(uid, None)
+        if self.journal is not None:
+            self.journal.forget(uid)
+
+
+def store_from_config(cfg) -> ProgressStore | None:
+    """
+    Wybór backendu na podstawie konfiguracji (st.secrets albo zwykły dict):
+    STORAGE_BACKEND = "github" (domyślnie) | "sqlite"
+    GITHUB_TOKEN / GITHUB_REPO / GITHUB_BRANCH — dla "github"
+    GITHUB_API_URL — dla "github": inny adres API (GitHub Enterprise, bench/fake_github.py)
+    STORAGE_LAYOUT = "file" (domyślnie, progress/{uid}.json) | "sharded" — dla "github"
+    SQLITE_PATH — dla "sqlite" (domyślnie progress.db)
+    RECORD_CACHE_SIZE / RECORD_CACHE_TTL_S — wspólny cache odczytów (0 = wyłączony)
+    Zwraca None, gdy brakuje konfiguracji.
+    """
+    backend = str(cfg.get("STORAGE_BACKEND", "github")).lower()
+    if backend == "sqlite":
+        store = SQLiteStore(cfg.get("SQLITE_PATH", "progress.db"))
+    elif backend == "github":
+        if "GITHUB_TOKEN" not in cfg or "GITHUB_REPO" not in cfg:
+            return None
+        layout = str(cfg.get("STORAGE_LAYOUT", "file")).lower()
+        if layout not in ("file", "sharded"):
+            raise ValueError(f"Nieznany STORAGE_LAYOUT: {layout}")
+        cls = GitHubShardedStore if layout == "sharded" else GitHubContentsStore
+        store = cls(
+            cfg["GITHUB_TOKEN"],
+            cfg["GITHUB_REPO"],
+            cfg.get("GITHUB_BRANCH", "main"),
+            cfg.get("GITHUB_API_URL", GITHUB_API_URL),
+        )
+    else:
+        raise ValueError(f"Nieznany STORAGE_BACKEND: {backend}")
+
+    size = int(cfg.get("RECORD_CACHE_SIZE", RECORD_CACHE_SIZE))
+    if size <= 0:
+        return store
+    return CachedStore(store, RecordCache(size, float(cfg.get("RECORD_CACHE_TTL_S", RECORD_CACHE_TTL_S))))
+
+
+IMPORT_TIMES["storage"] = time.perf_counter() - _IMPORT_T0
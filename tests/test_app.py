@@ -0,0 +1,33 @@
+# tests/test_app.py
+# Regresje app.py uruchamianego przez streamlit.testing (AppTest), backend SQLite.
+
+import os
+import re
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+CSS = os.path.join(os.path.dirname(APP), "static", "seduceme.css")
+
+
+@pytest.fixture
+def app(tmp_path):
+    at = AppTest.from_file(APP, default_timeout=30)
+    at.query_params["uid"] = "u1"
+    at.secrets["STORAGE_BACKEND"] = "sqlite"
+    at.secrets["SQLITE_PATH"] = str(tmp_path / "progress.db")
+    at.secrets["JOURNAL_PATH"] = str(tmp_path / "journal.ndjson")
+    return at
+
+
+def test_stylesheet_is_inlined_on_every_run(app):
+    with open(CSS, encoding="utf-8") as f:
+        selectors = set(re.findall(r"\.sdm-[\w-]+", f.read()))
+    for _ in range(2):  # pierwszy przebieg i rerun
+        app.run()
+        assert not app.exception
+        styles = [m.value for m in app.markdown if m.value.lstrip().startswith("<style>")]
+        assert len(styles) == 1
+        assert "<link" not in styles[0] and "\n\n" not in styles[0]
+        assert set(re.findall(r"\.sdm-[\w-]+", styles[0])) == selectors
@@ -0,0 +1,214 @@
+# tests/test_storage.py
+# Regresje SaveWorker / magazynów: zapisy kilku sesji (kart, urządzeń) jednego uid.
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage  # noqa: E402
+from bench.fake_github import FakeConfig, serve  # noqa: E402
+from storage import GitHubContentsStore, GitHubShardedStore, Journal, SaveWorker, SQLiteStore, make_record  # noqa: E402
+
+
+class GatedStore(SQLiteStore):
+    """SQLiteStore, którego zapisy czekają na otwarcie bramki — zapis "w locie" na żądanie; broken = błąd zapisu."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.gate = threading.Event()
+        self.gate.set()
+        self.broken = False
+
+    def save_if(self, uid, obj, version):
+        self.gate.wait(5)
+        if self.broken:
+            raise OSError("dysk pełny")
+        return super().save_if(uid, obj, version)
+
+
+def rec(completed: int) -> dict:
+    return make_record("u", "2026-01-01T00:00:00+01:00", completed, 0, "")
+
+
+def wait_result(worker: SaveWorker, uid: str, ticket: int, origin: str):
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        res = worker.result(uid, ticket, origin)
+        if res is not None:
+            return res
+        time.sleep(0.01)
+    pytest.fail("zapis nie zakończył się w 5 s")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return GatedStore(str(tmp_path / "progress.db"))
+
+
+def test_waiting_saves_of_two_sessions_are_merged(store):
+    v0 = store.save_if("u", rec(8), None)
+    worker = SaveWorker(store)
+    store.gate.clear()
+    worker.submit("u", rec(8), v0, rec(8), origin="x")  # zapis w locie
+    time.sleep(0.05)
+    ta = worker.submit("u", rec(8 | 1), v0, rec(8), origin="a")
+    tb = worker.submit("u", rec(8 | 2), v0, rec(8), origin="b")
+    store.gate.set()
+
+    for t, origin in ((ta, "a"), (tb, "b")):
+        _, error, saved = wait_result(worker, "u", t, origin)
+        assert error is None
+        assert saved["c"] == 8 | 1 | 2
+    assert store.load("u")[0]["c"] == 8 | 1 | 2
+
+
+def test_waiting_save_of_same_session_is_replaced(store):
+    v0 = store.save_if("u", rec(0), None)
+    worker = SaveWorker(store)
+    store.gate.clear()
+    worker.submit("u", rec(4), v0, rec(0), origin="x")
+    time.sleep(0.05)
+    worker.submit("u", rec(1), v0, rec(0), origin="a")
+    t = worker.submit("u", rec(0), v0, rec(0), origin="a")  # ta sama sesja cofnęła dzień 1
+    store.gate.set()
+
+    _, error, _ = wait_result(worker, "u", t, "a")
+    assert error is None
+    assert store.load("u")[0]["c"] == 4  # cofnięcie z sesji "a" + dzień 3 z sesji "x"
+
+
+def test_stale_submitters_conflict_and_merge(store):
+    v0 = store.save_if("u", rec(0), None)
+    worker = SaveWorker(store)
+    conflicts = storage.MERGE_STATS["conflicts"]
+    _, error, _ = wait_result(worker, "u", worker.submit("u", rec(1), v0, rec(0), origin="a"), "a")
+    assert error is None
+    # druga sesja wciąż na v0: jej zapis nie może nadpisać dnia 1 z sesji "a"
+    _, error, saved = wait_result(worker, "u", worker.submit("u", rec(2), v0, rec(0), origin="b"), "b")
+    assert error is None
+    assert saved["c"] == 1 | 2
+    assert store.load("u")[0]["c"] == 1 | 2
+    assert storage.MERGE_STATS["conflicts"] == conflicts + 1
+
+
+def test_same_session_chains_on_its_previous_save(store):
+    v0 = store.save_if("u", rec(0), None)
+    worker = SaveWorker(store)
+    conflicts = storage.MERGE_STATS["conflicts"]
+    wait_result(worker, "u", worker.submit("u", rec(1), v0, rec(0), origin="a"), "a")
+    # sesja nie odebrała jeszcze wyniku (wciąż v0) i cofa dzień 1 — bez konfliktu i bez wskrzeszania dnia 1
+    _, error, _ = wait_result(worker, "u", worker.submit("u", rec(0), v0, rec(0), origin="a"), "a")
+    assert error is None
+    assert store.load("u")[0]["c"] == 0
+    assert storage.MERGE_STATS["conflicts"] == conflicts
+
+
+def test_failed_save_of_other_session_is_not_reported_as_own(store):
+    v0 = store.save_if("u", rec(0), None)
+    worker = SaveWorker(store)
+    ta = worker.submit("u", rec(1), v0, rec(0), origin="a")
+    version, error, _ = wait_result(worker, "u", ta, "a")
+    assert error is None
+    store.broken = True
+    _, error, _ = wait_result(worker, "u", worker.submit("u", rec(3), version, rec(1), origin="b"), "b")
+    assert error is not None
+    # sesja "a" odbiera wynik dopiero teraz — to wciąż jej udany zapis, nie błąd sesji "b"
+    assert worker.result("u", ta, "a") == (version, None, rec(1))
+
+
+def test_journal_keeps_unacked_entry_of_other_session(store, tmp_path):
+    path = str(tmp_path / "journal.ndjson")
+    v0 = store.save_if("u", rec(0), None)
+    journal = Journal(path)
+    journal.append("u", rec(1), v0, rec(0), origin="a")  # karta a zamknięta przed wysłaniem
+    seq_b = journal.append("u", rec(2), v0, rec(0), origin="b")
+    store.save("u", rec(2), v0, rec(0))
+    journal.ack("u", seq_b, "b")
+    assert [e["origin"] for e in journal.pending()] == ["a"]
+
+    journal = Journal(path)  # restart procesu
+    assert [e["origin"] for e in journal.pending()] == ["a"]
+    SaveWorker(store, journal=journal)  # powtórka zaległych wpisów przy starcie
+    deadline = time.monotonic() + 5
+    while journal.pending() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert journal.pending() == []
+    assert store.load("u")[0]["c"] == 1 | 2
+
+
+def test_replay_of_two_sessions_acks_both_entries(store, tmp_path):
+    path = str(tmp_path / "journal.ndjson")
+    v0 = store.save_if("u", rec(0), None)
+    journal = Journal(path)
+    journal.append("u", rec(1), v0, rec(0), origin="a")
+    journal.append("u", rec(2), v0, rec(0), origin="b")
+
+    journal = Journal(path)
+    SaveWorker(store, journal=journal)
+    deadline = time.monotonic() + 5
+    while journal.pending() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert journal.pending() == []
+    assert store.load("u")[0]["c"] == 1 | 2
+    assert Journal(path).pending() == []
+
+
+@pytest.fixture
+def fake_github():
+    server, fake = serve(FakeConfig())
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_sharded_save_after_reset(fake_github):
+    store = GitHubShardedStore("token", "owner/repo", api_url=fake_github)
+    store.save("u", rec(1), None)
+    store.delete("u")
+    assert store.load("u") == (None, None)
+    failed = storage.MERGE_STATS["failed"]
+    version, _ = store.save("u", rec(2), None)
+    assert store.load("u") == (rec(2), version)
+    assert storage.MERGE_STATS["failed"] == failed
+
+
+def test_sharded_compaction_failure_does_not_fail_the_save(fake_github, monkeypatch):
+    store = GitHubShardedStore("token", "owner/repo", api_url=fake_github)
+    monkeypatch.setattr(storage, "LOG_COMPACT_AT", 1)
+
+    def broken(shard):
+        raise storage.RateLimited(time.time() + 60)
+
+    monkeypatch.setattr(store, "_compact", broken)
+    compact_failed = storage.MERGE_STATS["compact_failed"]
+    version, _ = store.save("u", rec(1), None)
+    assert store.load("u") == (rec(1), version)
+    assert storage.MERGE_STATS["compact_failed"] == compact_failed + 1
+
+
+@pytest.fixture
+def limited_github():
+    """fake GitHub z jednym zapytaniem na okno 3 s — kolejne czeka na reset limitu."""
+    server, fake = serve(FakeConfig(rate_limit=1, rate_window_s=3))
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_interactive_read_does_not_wait_for_rate_limit_reset(limited_github):
+    store = GitHubContentsStore("token", "owner/repo", api_url=limited_github)
+    store.load("u")
+    t0 = time.monotonic()
+    with pytest.raises(storage.RateLimited):
+        store.load("u")
+    assert time.monotonic() - t0 < 1
+
+
+def test_background_read_waits_for_rate_limit_reset(limited_github):
+    store = GitHubContentsStore("token", "owner/repo", api_url=limited_github)
+    store.load("u")
+    with storage.http_background():
+        assert store.load("u") == (None, None)
@@ -0,0 +1,129 @@
+# tracing.py
+# Lekkie spany czasowe dla app.py i storage.py.
+# - span("nazwa", **atrybuty) / @traced("nazwa"): mierzy czas bloku / funkcji
+# - SPANS: bufor cykliczny ostatnich spanów (wspólny dla procesu), eksport jako JSON lines
+# - summary(): p50/p95/p99 per nazwa spanu
+#
+# - IMPORT_TIMES / import_timer: czasy importów modułów w procesie (panel profilu startu w app.py)
+#
+# Koszt spanu to dwa perf_counter i append do deque — można go zostawić włączonego na produkcji.
+
+import time
+
+_IMPORT_T0 = time.perf_counter()
+
+import functools
+import itertools
+import json
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+TRACE_BUFFER_SIZE = 5000
+
+SPANS: deque[dict] = deque(maxlen=TRACE_BUFFER_SIZE)
+
+# czas importu (s) per moduł, wspólny dla procesu: ten moduł, storage (+ jego leniwe importy), import_timer
+IMPORT_TIMES: dict[str, float] = {}
+
+_ids = itertools.count(1)
+_local = threading.local()  # stos otwartych spanów w bieżącym wątku (rodzic = ostatni)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    Mierzy blok i dopisuje rekord do SPANS. Zwraca słownik atrybutów, który można
+    uzupełnić w trakcie (np. status odpowiedzi). Wyjątek jest zapisywany i przepuszczany dalej
+    (st.rerun/st.stop to nie wyjątki z Exception — span kończy się wtedy bez błędu).
+    """
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    span_id = next(_ids)
+    parent = stack[-1] if stack else None
+    stack.append(span_id)
+    start = time.time()
+    t0 = time.perf_counter()
+    try:
+        yield attrs
+    except Exception as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        ms = (time.perf_counter() - t0) * 1000
+        stack.pop()
+        SPANS.append({
+            "id": span_id,
+            "parent": parent,
+            "name": name,
+            "start": start,
+            "ms": round(ms, 3),
+            "thread": threading.current_thread().name,
+            **attrs,
+        })
+
+
+@contextmanager
+def import_timer(name: str):
+    """Czas importów w bloku -> IMPORT_TIMES[name]. Liczy się pierwszy pomiar w procesie (potem to trafienia w sys.modules)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        IMPORT_TIMES.setdefault(name, time.perf_counter() - t0)
+
+
+def traced(name: str | None = None):
+    """Dekorator: każde wywołanie funkcji to jeden span (domyślnie nazwa = nazwa funkcji)."""
+    def deco(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Percentyl metodą najbliższej rangi (wartości muszą być posortowane)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summary(spans=None) -> list[dict]:
+    """Jeden wiersz na nazwę spanu: liczba, p50/p95/p99 i max (ms), liczba błędów."""
+    by_name: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+    for s in list(SPANS if spans is None else spans):
+        by_name.setdefault(s["name"], []).append(s["ms"])
+        if "error" in s:
+            errors[s["name"]] = errors.get(s["name"], 0) + 1
+    rows = []
+    for name, values in sorted(by_name.items()):
+        values.sort()
+        rows.append({
+            "name": name,
+            "count": len(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+            "max": values[-1],
+            "errors": errors.get(name, 0),
+        })
+    return rows
+
+
+def export_jsonl(spans=None) -> str:
+    """Spany jako JSON lines (jeden obiekt na linię), od najstarszego."""
+    return "".join(
+        json.dumps(s, ensure_ascii=False, separators=(",", ":")) + "\n"
+        for s in list(SPANS if spans is None else spans)
+    )
+
+
+IMPORT_TIMES["tracing"] = time.perf_counter() - _IMPORT_T0